@@ -105,6 +105,8 @@ async def main():
     
     logging.info(f"Iniciando Auditor Reconstrutor na aba '{SheetsService.MAIN_WORKSHEET_NAME}'...")
     await auditor.run_reconstruction(SheetsService.MAIN_WORKSHEET_NAME)
+    logging.info(api_football_svc.http.stats_summary())
+    logging.info(sheets_svc.quota.summary())
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
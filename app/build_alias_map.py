@@ -1,13 +1,12 @@
 # Arquivo: build_alias_map.py
 # Descrição: Ferramenta profissional para criar um mapa de IDs de times.
-# Versão: 5.3 - Modificado para continuar o processo a partir de um ponto específico.
+# Versão: 5.4 - Chamadas pelo cliente compartilhado, sem pausas fixas entre países.
 
-import requests
 import json
-import time
 import re
 import os
 from app.config import config
+from app.services.api_football_client import get_client
 
 # Dicionário de apelidos comuns. Podemos expandir isso conforme necessário.
 MANUAL_ALIASES = {
@@ -30,19 +29,9 @@ MANUAL_ALIASES = {
 }
 
 def call_api(endpoint, params=None):
-    """Função genérica para chamar a API-Football."""
-    headers = {
-        'x-rapidapi-key': config.API_FOOTBALL_KEY,
-        'x-rapidapi-host': 'v3.football.api-sports.io'
-    }
-    url = f"https://v3.football.api-sports.io/{endpoint}"
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json().get('response', [])
-    except requests.exceptions.RequestException as e:
-        print(f"  -> Erro de rede ao chamar '{endpoint}': {e}")
-        return []
+    """Função genérica para chamar a API-Football pelo cliente compartilhado (retry e limite de taxa inclusos)."""
+    data = get_client(config).get(endpoint, params)
+    return data.get('response', []) if data else []
 
 def clean_name_for_key(name):
     """Limpa um nome para ser usado como chave no dicionário."""
@@ -65,10 +54,12 @@ def load_existing_mappings(filepath):
     return {}
 
 def save_mappings(filepath, data):
-    """Salva o dicionário de mapas no arquivo JSON."""
+    """Salva o dicionário de mapas no arquivo JSON (arquivo temporário + rename, para nunca deixá-lo corrompido)."""
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, filepath)
     except Exception as e:
         print(f"\nERRO ao salvar o arquivo JSON '{filepath}': {e}")
 
@@ -106,8 +97,7 @@ def create_alias_map():
 
         print(f"\n({current_position}/{total_countries}) Processando país: {country_name}...")
         
-        time.sleep(7) 
-        
+        # Sem pausa fixa: o limitador do cliente respeita a cota informada pela API.
         teams_in_country = call_api('teams', {'country': country_name})
 
         if teams_in_country:
@@ -1,27 +1,15 @@
 # Arquivo: build_league_map.py
 # Descrição: Ferramenta para criar um mapa de nomes de ligas para seus IDs oficiais da API-Football.
-# Versão: 5.4 - Lógica de paginação reconstruída com base na documentação oficial para buscar TODAS as ligas.
+# Versão: 5.6 - Ligas indexadas por país + nome ("Premier League" existe em vários países).
 
-import requests
 import json
-import time
 from app.config import config
+from app.services.api_football_client import get_client
 
 def call_api(endpoint, params=None):
-    """Função genérica para chamar a API-Football, agora retornando o objeto de resposta completo."""
-    headers = {
-        'x-rapidapi-key': config.API_FOOTBALL_KEY,
-        'x-rapidapi-host': 'v3.football.api-sports.io'
-    }
-    url = f"https://v3.football.api-sports.io/{endpoint}"
-    try:
-        print(f"  -> Chamando API: {url} com parâmetros: {params}")
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json() # Retorna o objeto JSON completo
-    except requests.exceptions.RequestException as e:
-        print(f"  -> Erro de rede ao chamar '{endpoint}': {e}")
-        return None
+    """Função genérica para chamar a API-Football, retornando o objeto de resposta completo."""
+    print(f"  -> Chamando API: {endpoint} com parâmetros: {params}")
+    return get_client(config).get(endpoint, params)
 
 def create_league_mappings():
     """
@@ -55,8 +43,7 @@ def create_league_mappings():
     if total_pages > 1:
         for page in range(current_page + 1, total_pages + 1):
             print(f"Buscando página {page}/{total_pages}...")
-            # Com o plano pago, um delay curto é suficiente para ser "educado" com a API.
-            time.sleep(2) 
+            # O limitador do cliente cuida do ritmo das chamadas conforme a cota do plano.
             
             page_params = {'current': 'true', 'page': page}
             page_data = call_api('leagues', page_params)
@@ -73,12 +60,14 @@ def create_league_mappings():
         league_info = item.get('league', {})
         league_id = league_info.get('id')
         league_name = league_info.get('name')
+        country_name = item.get('country', {}).get('name') or ''
 
         if league_id and league_name:
-            # Salva o nome em minúsculas como chave para facilitar a busca
-            league_mappings[league_name.lower()] = {
+            # Chave "país/nome" em minúsculas: o mesmo nome de liga existe em vários países
+            league_mappings[f"{country_name}/{league_name}".lower()] = {
                 "id": league_id,
-                "name": league_name # Salva o nome oficial com a formatação correta
+                "name": league_name, # Salva o nome oficial com a formatação correta
+                "country": country_name
             }
     
     print(f"\nBusca concluída. {len(league_mappings)} ligas únicas mapeadas.")
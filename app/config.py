@@ -21,17 +21,101 @@ class Config:
     
     # --- Configurações de Comportamento ---
     RESULT_CHECK_HOURS_AGO = float(os.getenv('RESULT_CHECK_HOURS_AGO', 2.5))
+
+    CONFIG_POLL_INTERVAL_SECONDS = float(os.getenv('CONFIG_POLL_INTERVAL_SECONDS', 0.5))
+
+    # --- API-Football ---
+    # Limite inicial por minuto; é ajustado automaticamente pelos headers x-ratelimit-* de cada resposta.
+    API_FOOTBALL_RATE_PER_MINUTE = float(os.getenv('API_FOOTBALL_RATE_PER_MINUTE', 10))
+    API_FOOTBALL_POOL_SIZE = int(os.getenv('API_FOOTBALL_POOL_SIZE', 8))
+    API_FOOTBALL_MAX_RETRIES = int(os.getenv('API_FOOTBALL_MAX_RETRIES', 3))
+    API_FOOTBALL_TIMEOUT_SECONDS = float(os.getenv('API_FOOTBALL_TIMEOUT_SECONDS', 20))
+    # Validade do cache diário de partidas: dias com jogos ao vivo x dias com jogos ainda não encerrados.
+    FIXTURES_LIVE_TTL_SECONDS = float(os.getenv('FIXTURES_LIVE_TTL_SECONDS', 120))
+    FIXTURES_PENDING_TTL_SECONDS = float(os.getenv('FIXTURES_PENDING_TTL_SECONDS', 1800))
+    # Adiadas/canceladas/abandonadas podem ser remarcadas: revalidadas a cada poucas horas.
+    FIXTURES_POSTPONED_TTL_SECONDS = float(os.getenv('FIXTURES_POSTPONED_TTL_SECONDS', 3 * 3600))
+    # Cache em disco das respostas: times por ID e partidas encerradas nunca expiram; o resto segue estes TTLs.
+    API_CACHE_ENABLED = os.getenv('API_CACHE_ENABLED', 'true').lower() == 'true'
+    API_CACHE_TEAMS_TTL_DAYS = float(os.getenv('API_CACHE_TEAMS_TTL_DAYS', 30))
+    API_CACHE_LEAGUES_TTL_DAYS = float(os.getenv('API_CACHE_LEAGUES_TTL_DAYS', 7))
+    API_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv('API_CACHE_DEFAULT_TTL_SECONDS', 3600))
+    API_CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', 20000))
+    API_CACHE_MEMORY_SIZE = int(os.getenv('API_CACHE_MEMORY_SIZE', 64))
+    # Modo offline: nenhuma requisição sai para a rede; só o que estiver no cache (mesmo vencido) é usado.
+    API_FOOTBALL_OFFLINE = os.getenv('API_FOOTBALL_OFFLINE', 'false').lower() == 'true'
+
+    # --- Resolução de Times ---
+    # Similaridade mínima para aceitar um nome de time resolvido localmente (0 a 1).
+    TEAM_FUZZY_THRESHOLD = float(os.getenv('TEAM_FUZZY_THRESHOLD', 0.8))
+    # Dentro do elenco de uma liga há poucos candidatos, então o limiar pode ser mais baixo.
+    LEAGUE_ROSTER_FUZZY_THRESHOLD = float(os.getenv('LEAGUE_ROSTER_FUZZY_THRESHOLD', 0.7))
+
+    # Cache negativo: nomes não encontrados só são buscados de novo após o TTL, que dobra a cada falha.
+    TEAM_NEGATIVE_TTL_HOURS = float(os.getenv('TEAM_NEGATIVE_TTL_HOURS', 24))
+    TEAM_NEGATIVE_MAX_TTL_DAYS = float(os.getenv('TEAM_NEGATIVE_MAX_TTL_DAYS', 30))
+
+    # --- Cliente de IA (Gemini) ---
+    AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 4))
+    AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', 90))
+    AI_BATCH_ENABLED = os.getenv('AI_BATCH_ENABLED', 'false').lower() == 'true'
+    AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', 8))
+    AI_BATCH_MAX_WAIT_MS = float(os.getenv('AI_BATCH_MAX_WAIT_MS', 1500))
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CACHE_TTL_DAYS = float(os.getenv('AI_CACHE_TTL_DAYS', 30))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 50000))
+    AI_CACHE_MEMORY_SIZE = int(os.getenv('AI_CACHE_MEMORY_SIZE', 2000))
+
+    # --- Banco de Dados Local (deduplicação) ---
+    DB_RETENTION_DAYS = int(os.getenv('DB_RETENTION_DAYS', 90))
+    DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 20))
+    DB_FLUSH_INTERVAL_SECONDS = float(os.getenv('DB_FLUSH_INTERVAL_SECONDS', 5))
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', 50000))
+    DB_BLOOM_CAPACITY = int(os.getenv('DB_BLOOM_CAPACITY', 1000000))
+
+    # --- Pré-classificador Local ---
+    # 'off', 'shadow' (só registra concordância com a IA) ou 'active' (pula a IA para não-apostas).
+    PRECLASSIFIER_MODE = os.getenv('PRECLASSIFIER_MODE', 'shadow').lower()
+    PRECLASSIFIER_SKIP_THRESHOLD = float(os.getenv('PRECLASSIFIER_SKIP_THRESHOLD', 0.85))
+
+    # --- Detecção de Reposts ---
+    DEDUP_WINDOW_MINUTES = float(os.getenv('DEDUP_WINDOW_MINUTES', 30))
+
+    # --- Google Sheets ---
+    # O outbox do ledger é replicado para a planilha a cada N operações ou T segundos.
+    SHEETS_BATCH_SIZE = int(os.getenv('SHEETS_BATCH_SIZE', 20))
+    SHEETS_FLUSH_INTERVAL_SECONDS = float(os.getenv('SHEETS_FLUSH_INTERVAL_SECONDS', 5))
+    # Cota da API do Sheets por usuário (padrão do Google: 60 leituras e 60 escritas por minuto).
+    SHEETS_READS_PER_MINUTE = int(os.getenv('SHEETS_READS_PER_MINUTE', 60))
+    SHEETS_WRITES_PER_MINUTE = int(os.getenv('SHEETS_WRITES_PER_MINUTE', 60))
+    SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+
+    # --- Fila de Ingestão ---
+    INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', 4))
+    INGESTION_QUEUE_SIZE = int(os.getenv('INGESTION_QUEUE_SIZE', 200))
+    ALBUM_WINDOW_SECONDS = float(os.getenv('ALBUM_WINDOW_SECONDS', 1.5))
+    # Backfill acima disso (por canal) é avisado no log; todas as mensagens do intervalo são recuperadas mesmo assim.
+    BACKFILL_MAX_MESSAGES = int(os.getenv('BACKFILL_MAX_MESSAGES', 500))
+    # IDs de canais (separados por vírgula) cujas mensagens furam a fila.
+    PRIORITY_CHANNEL_IDS = {int(c) for c in os.getenv('PRIORITY_CHANNEL_IDS', '').split(',') if c.strip()}
     
     # --- Caminhos de Arquivos ---
     DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
     DB_PATH = os.path.join(DATA_DIR, 'bets.db')
+    AI_CACHE_PATH = os.path.join(DATA_DIR, 'ai_cache.db')
+    API_CACHE_PATH = os.path.join(DATA_DIR, 'api_cache.db')
+    LEDGER_PATH = os.path.join(DATA_DIR, 'ledger.db')
+    SHEET_MIRROR_PATH = os.path.join(DATA_DIR, 'sheet_mirror.db')
     PROMPTS_DIR = os.path.join(os.path.dirname(__file__), 'prompts')
     PROMPT_PATH = os.path.join(PROMPTS_DIR, 'main_prompt.txt')
+    BATCH_PROMPT_PATH = os.path.join(PROMPTS_DIR, 'batch_prompt.txt')
     VALIDATION_PROMPT_PATH = os.path.join(PROMPTS_DIR, 'validation_prompt.txt')
     QUERY_GENERATOR_PROMPT_PATH = os.path.join(PROMPTS_DIR, 'query_generator_prompt.txt')
     FINAL_ANALYSIS_PROMPT_PATH = os.path.join(PROMPTS_DIR, 'final_analysis_prompt.txt')
     CONTEXT_DIR = os.path.join(os.path.dirname(__file__), 'context')
     MAPPINGS_DIR = PROJECT_ROOT
+    TEAM_MAPPINGS_DB_PATH = os.path.join(DATA_DIR, 'team_mappings.db')
+    LEAGUE_MAPPINGS_DB_PATH = os.path.join(DATA_DIR, 'league_mappings.db')
     SESSION_FILE = os.path.join(PROJECT_ROOT, "bot_session")
 
     def __init__(self):
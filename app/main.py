@@ -1,10 +1,11 @@
 # Arquivo: app/main.py
-# Versão: 14.4 - Corrigido TypeError na instanciação do BetProcessorService.
+# Versão: 15.3 - Álbuns (grouped_id) agregados em uma única análise.
 
 import asyncio
 import logging
 import json
 import os
+import signal
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
 
@@ -16,42 +17,66 @@ from app.services.ai_service import AIService
 from app.services.sheets_service import SheetsService
 from app.services.api_football_service import ApiFootballService
 from app.services.bet_processor_service import BetProcessorService
+from app.services.ingestion_service import IngestionQueue, AlbumAggregator
+from app.services.dedup_service import NearDuplicateDetector
+from app.services.preclassifier_service import MessagePreClassifier
 # A importação do Google Search_service não é mais necessária aqui.
 
 # --- Lógica de Gerenciamento Dinâmico de Canais ---
-current_monitored_channels = set()
+CONFIG_PATH = os.path.join(config.PROJECT_ROOT, 'config.json')
+# Conjunto imutável trocado atomicamente a cada recarga; o handler só faz um teste de pertinência.
+current_monitored_channels = frozenset()
+# Referências às tarefas em segundo plano: o loop só guarda referências fracas, e uma tarefa sem dono pode ser coletada.
+background_tasks = set()
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 def load_channels_from_config():
-    config_path = os.path.join(config.PROJECT_ROOT, 'config.json')
+    """Retorna os canais do config.json, ou None se o arquivo estiver ilegível (ex: no meio de uma gravação)."""
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            return set(data.get('telegram_channel_ids', []))
+            return frozenset(data.get('telegram_channel_ids', []))
     except Exception as e:
         logging.error(f"Não foi possível carregar 'config.json': {e}")
-        return set()
+        return None
+
+def get_config_mtime():
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return None
 
-async def config_reloader_task(client: TelegramClient):
+async def config_reloader_task():
     global current_monitored_channels
-    logging.info("[Supervisor] Iniciado. Verificando config.json a cada 60 segundos.")
-    
+    interval = config.CONFIG_POLL_INTERVAL_SECONDS
+    logging.info(f"[Supervisor] Iniciado. Observando alterações no config.json a cada {interval}s.")
+    last_mtime = get_config_mtime()
+
     while True:
-        await asyncio.sleep(60)
+        await asyncio.sleep(interval)
+        mtime = get_config_mtime()
+        if mtime is None or mtime == last_mtime:
+            continue
+
         new_channel_ids = load_channels_from_config()
-        
+        if new_channel_ids is None:
+            continue  # Tenta de novo na próxima verificação, mantendo os canais atuais.
+        last_mtime = mtime
+
         if new_channel_ids != current_monitored_channels:
             logging.warning(f"[Supervisor] Mudança detectada no config.json! Atualizando canais.")
-            
-            channels_to_remove = current_monitored_channels - new_channel_ids
-            for channel_id in channels_to_remove:
-                client.remove_event_handler(handle_new_message, events.NewMessage(chats=[channel_id]))
-            
             channels_to_add = new_channel_ids - current_monitored_channels
-            for channel_id in channels_to_add:
-                client.add_event_handler(handle_new_message, events.NewMessage(chats=[channel_id]))
-
             current_monitored_channels = new_channel_ids
             logging.info(f"[Supervisor] Monitoramento atualizado para {len(current_monitored_channels)} canais.")
+            if channels_to_add:
+                # Canal adicionado (ou readicionado) em tempo de execução começa da mensagem mais recente:
+                # a marca antiga de quando ele foi removido reprocessaria semanas de histórico.
+                spawn(backfill_missed_messages(dict.fromkeys(channels_to_add)))
 
 # --- Inicialização dos Serviços ---
 db = DbService(config)
@@ -59,7 +84,9 @@ ai = AIService(config)
 sheets = SheetsService(config)
 api_football = ApiFootballService(config, ai)
 # CORREÇÃO: Removido o Google Search_svc daqui.
-processor = BetProcessorService(ai, api_football)
+dedup = NearDuplicateDetector(window_minutes=config.DEDUP_WINDOW_MINUTES)
+preclassifier = MessagePreClassifier(config)
+processor = BetProcessorService(ai, api_football, dedup, preclassifier)
 
 # --- Cliente Telethon ---
 if not config.TELETHON_SESSION_STRING:
@@ -67,37 +94,121 @@ if not config.TELETHON_SESSION_STRING:
 session = StringSession(config.TELETHON_SESSION_STRING)
 client = TelegramClient(session, int(config.TELEGRAM_API_ID), config.TELEGRAM_API_HASH)
 
+def get_post_priority(messages):
+    """Fotos e canais marcados como prioritários passam na frente do resto."""
+    first = messages[0]
+    if first.chat_id in config.PRIORITY_CHANNEL_IDS or any(m.photo for m in messages):
+        return IngestionQueue.PRIORITY_HIGH
+    return IngestionQueue.PRIORITY_NORMAL
+
+async def enqueue_post(messages):
+    """Enfileira um 'post': uma mensagem avulsa ou todas as partes de um álbum."""
+    await ingestion_queue.put(messages[0].chat_id, messages, get_post_priority(messages))
+
+async def enqueue_message(message):
+    # Partes de álbum são agrupadas; mensagens avulsas seguem direto, a menos que um álbum do canal esteja aberto.
+    await album_aggregator.add(message)
+
 async def handle_new_message(event):
-    message = event.message
-    channel_id, message_id, channel_name = event.chat_id, message.id, event.chat.title
+    """Handler único: filtra o canal em O(1) e enfileira; o processamento pesado acontece nos workers."""
+    if event.chat_id not in current_monitored_channels:
+        return
+    await enqueue_message(event.message)
+
+async def process_queued_post(messages):
+    message = messages[0]
+    channel_id, message_id = message.chat_id, message.id
 
-    if db.is_message_processed(channel_id, message_id):
+    if all(db.is_message_processed(channel_id, m.id) for m in messages):
         return
 
-    processed_bet, status = await processor.process_message(message, channel_name)
+    chat = await message.get_chat()
+    channel_name = chat.title
+    album = messages if len(messages) > 1 else None
+    processed_bet, status = await processor.process_message(message, channel_name, album=album)
     
     if status == "Success" and processed_bet:
         message_link = f"https://t.me/c/{str(channel_id).replace('-100', '')}/{message_id}"
         sheets.write_bet(processed_bet, message_link)
 
-    db.add_processed_message(channel_id, message_id)
+    for m in messages:
+        db.add_processed_message(channel_id, m.id)
+    if status == "Success" and processed_bet:
+        # A aposta já está no registro local: a marcação vai para o disco na hora, fora do lote,
+        # senão um reinício antes do próximo flush faria o backfill gravá-la de novo.
+        db.flush()
     logging.info(f"--- Processamento da Mensagem {message_id} Concluído ---")
 
+async def backfill_channel(channel_id, last_id):
+    """
+    Enfileira, em ordem, as mensagens publicadas no canal depois de `last_id`.
+    `last_id` deve ser lido antes de a ingestão ao vivo começar: a primeira mensagem ao vivo já
+    avança a marca d'água do canal, e ler a marca depois pularia todo o intervalo perdido.
+    """
+    if last_id is None:
+        # Sem ponto de partida: apenas registra a mensagem mais recente como marca para os próximos reinícios.
+        latest = await client.get_messages(channel_id, limit=1)
+        if latest:
+            db.set_last_message_id(channel_id, latest[0].id)
+        return 0
+
+    count = 0
+    # O intervalo é percorrido inteiro (iter_messages pagina em lotes de até 100 por requisição):
+    # cortar num limite perderia justamente as mensagens mais novas, e a marca d'água passaria por cima delas.
+    async for message in client.iter_messages(channel_id, min_id=last_id, reverse=True):
+        await enqueue_message(message)
+        count += 1
+        if count == config.BACKFILL_MAX_MESSAGES:
+            logging.warning(f"[Backfill] Canal {channel_id}: mais de {count} mensagens perdidas desde a {last_id}. "
+                            f"Recuperando todas; isso pode demorar.")
+    return count
+
+async def backfill_missed_messages(start_ids):
+    """Recupera as mensagens perdidas a partir das marcas `{channel_id: last_message_id}` informadas."""
+    logging.info(f"[Backfill] Verificando mensagens perdidas em {len(start_ids)} canais...")
+    total = 0
+    for channel_id, last_id in start_ids.items():
+        try:
+            recovered = await backfill_channel(channel_id, last_id)
+            if recovered:
+                logging.warning(f"[Backfill] {recovered} mensagens perdidas do canal {channel_id} enfileiradas.")
+            total += recovered
+        except Exception as e:
+            logging.error(f"[Backfill] Erro ao recuperar mensagens do canal {channel_id}: {e}")
+    logging.info(f"[Backfill] Concluído. {total} mensagens recuperadas.")
+
+ingestion_queue = IngestionQueue(process_queued_post, workers=config.INGESTION_WORKERS, maxsize=config.INGESTION_QUEUE_SIZE)
+album_aggregator = AlbumAggregator(enqueue_post, window=config.ALBUM_WINDOW_SECONDS)
+
 async def main():
-    logging.info("Iniciando o PlanilhadorBot v14.4 (Correção Final)...")
+    logging.info("Iniciando o PlanilhadorBot v15.3 (Fila de Ingestão + Backfill)...")
     db.setup_database()
     
     global current_monitored_channels
-    current_monitored_channels = load_channels_from_config()
-    client.add_event_handler(handle_new_message, events.NewMessage(chats=list(current_monitored_channels)))
+    current_monitored_channels = load_channels_from_config() or frozenset()
+    # Marcas lidas antes de registrar o handler: nenhuma mensagem ao vivo pode ter avançado nenhuma delas ainda.
+    start_ids = {channel_id: db.get_last_message_id(channel_id) for channel_id in current_monitored_channels}
+    client.add_event_handler(handle_new_message, events.NewMessage())
     
     await client.start()
     logging.info("Bot conectado e pronto.")
+    # O Heroku envia SIGTERM a cada reinício do dyno: desconectar encerra run_until_disconnected
+    # e o `finally` abaixo grava as marcações e o outbox pendentes antes de o processo sair.
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: spawn(client.disconnect()))
     
-    asyncio.create_task(config_reloader_task(client))
+    ingestion_queue.start()
+    # Eventos ao vivo já estão sendo enfileirados; a sobreposição com o backfill é filtrada pelo DbService.
+    spawn(backfill_missed_messages(start_ids))
+    spawn(db.maintenance_task())
+    spawn(ingestion_queue.log_stats_periodically())
+    spawn(config_reloader_task())
     
     logging.info(f"Monitorando {len(current_monitored_channels)} canais dinamicamente...")
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        db.close()
+        sheets.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
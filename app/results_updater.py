@@ -1,5 +1,5 @@
 # Arquivo: app/results_updater.py
-# Versão: Final - Otimizado para rodar a cada 6 horas e arquivar apostas.
+# Versão: 2.1 - Resultados gravados no registro local de apostas; a planilha é replicada em segundo plano.
 
 import asyncio
 import pandas as pd
@@ -65,29 +65,48 @@ async def main_loop(sheets: SheetsService, api_football: ApiFootballService):
             if pending_bets is not None and not pending_bets.empty:
                 logging.info(f"Encontradas {len(pending_bets)} apostas pendentes para verificação.")
                 updates_for_sheets = []
-                
-                for index, bet in pending_bets.iterrows():
-                    row_number = int(bet['row_number'])
+
+                def register_outcome(bet, fixture):
+                    if fixture.get('fixture', {}).get('status', {}).get('short') != 'FT': return
+                    outcome = determine_bet_outcome(bet, fixture)
+                    if outcome != "Pendente":
+                        logging.info(f"  -> Aposta {bet['Bet ID']}: Resultado encontrado - {outcome}.")
+                        updates_for_sheets.append({'bet_id': bet['Bet ID'], 'col_name': 'Situação', 'value': outcome})
+
+                # 1. Apostas com Fixture ID salvo: status atualizado em lote (até 20 partidas por requisição).
+                has_fixture_id = pending_bets.get('Fixture ID', pd.Series(index=pending_bets.index, dtype=object)).astype(str).str.isdigit()
+                with_ids, legacy = pending_bets[has_fixture_id], pending_bets[~has_fixture_id]
+                if not with_ids.empty:
+                    fixtures = await api_football.get_fixtures_by_ids(with_ids['Fixture ID'].astype(int).tolist())
+                    for index, bet in with_ids.iterrows():
+                        fixture = fixtures.get(int(bet['Fixture ID']))
+                        if fixture:
+                            register_outcome(bet, fixture)
+
+                # 2. Apostas antigas, sem Fixture ID: busca por data e times (via cache diário) e grava o ID encontrado.
+                for index, bet in legacy.iterrows():
                     home_id, away_id = bet.get('Home Team ID'), bet.get('Away Team ID')
 
                     if home_id and away_id and str(home_id).isdigit() and str(away_id).isdigit():
                         fixture, reason = await api_football.find_match_by_ids(int(home_id), int(away_id), bet.get('Data Completa'))
-                        if reason == "Success" and fixture and fixture.get('fixture', {}).get('status', {}).get('short') == 'FT':
-                            outcome = determine_bet_outcome(bet, fixture)
-                            if outcome != "Pendente":
-                                logging.info(f"  -> Linha {row_number}: Resultado encontrado - {outcome}.")
-                                updates_for_sheets.append({'row': row_number, 'col_name': 'Situação', 'value': outcome})
-                        await asyncio.sleep(7)
+                        if reason == "Success" and fixture:
+                            updates_for_sheets.append({'bet_id': bet['Bet ID'], 'col_name': 'Fixture ID', 'value': fixture['fixture']['id']})
+                            register_outcome(bet, fixture)
                 
                 if updates_for_sheets:
-                    logging.info(f"Enviando {len(updates_for_sheets)} atualizações para o Google Sheets...")
-                    sheets.batch_update_cells(updates_for_sheets)
+                    # Gravadas no registro local; a planilha é atualizada em segundo plano pelo replicador.
+                    sheets.record_updates(updates_for_sheets)
             else:
                 logging.info("Nenhuma aposta pendente pronta para verificação no momento.")
             
             # --- LÓGICA DE ARQUIVAMENTO ---
             sheets.archive_completed_bets()
 
+            # --- COMPACTAÇÃO DO MAPA DE TIMES (exporta o SQLite para o team_mappings.json) ---
+            api_football.mapping_store.export_json()
+            logging.info(api_football.http.stats_summary())
+            logging.info(sheets.quota.summary())
+
         except Exception as e:
             logging.critical(f"ERRO CRÍTICO no loop do results_updater: {e}")
 
@@ -0,0 +1,17 @@
+# Arquivo: app/resync_mirror.py
+# Descrição: Ressincronização manual do espelho local da aba APOSTAS (lê a aba inteira do Google).
+# Uso:
+#   python -m app.resync_mirror
+
+import logging
+from app.config import config
+from app.services.sheets_service import SheetsService
+
+def main():
+    sheets = SheetsService(config)
+    sheets.sync_mirror(full=True)
+    print(f"✅ Espelho ressincronizado: {sheets.mirror.count()} linhas da aba '{SheetsService.MAIN_WORKSHEET_NAME}'.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,20 @@
+# Arquivo: app/retry_outbox.py
+# Descrição: Reativa as operações descartadas do outbox e tenta replicá-las para a planilha agora.
+# Uso:
+#   python -m app.retry_outbox
+
+import logging
+from app.config import config
+from app.services.sheets_service import SheetsService
+
+def main():
+    sheets = SheetsService(config)
+    revived = sheets.ledger.revive_dead()
+    done = sheets.replicator.flush(timeout=300)
+    sheets.close()
+    remaining = "vazio" if done else f"com {sheets.ledger.outbox_count()} operações pendentes (veja o log)"
+    print(f"✅ {revived} operações reativadas. Outbox {remaining}.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -1,27 +1,65 @@
 # Arquivo: app/services/ai_service.py
-# Versão: Final - Lógica unificada de extração e validação em uma única chamada.
+# Versão: 2.2 - Micro-lotes opcionais de mensagens de texto em uma única chamada ao Gemini.
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import asyncio
+import functools
+import hashlib
 import json
 import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import io
 from app.config import config
+from app.services.cache_service import TieredCache, make_key
 
 class AIService:
+    MODEL_NAME = 'gemini-1.5-pro-latest'
+
     def __init__(self, cfg: config):
         self.config = cfg
         genai.configure(api_key=self.config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
+        self.timeout = self.config.AI_TIMEOUT_SECONDS
+        # Pool próprio: chamadas lentas ao Gemini não disputam o executor padrão do loop.
+        self._executor = ThreadPoolExecutor(max_workers=self.config.AI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+        self._semaphore = None
+        self._batch = []          # [(id, texto, canal, future)] aguardando o próximo envio em lote
+        self._batch_timer = None
+        self._batch_seq = 0
+        self._batch_tasks = set()  # o loop só guarda referências fracas às tarefas
         self._load_prompts()
+        self.cache = TieredCache(
+            self.config.AI_CACHE_PATH, 'ai_results',
+            ttl_seconds=self.config.AI_CACHE_TTL_DAYS * 86400,
+            max_entries=self.config.AI_CACHE_MAX_ENTRIES,
+            memory_size=self.config.AI_CACHE_MEMORY_SIZE,
+        ) if self.config.AI_CACHE_ENABLED else None
 
     def _load_prompts(self):
         try:
             with open(self.config.PROMPT_PATH, 'r', encoding='utf-8') as f:
                 self.main_prompt = f.read()
+            with open(self.config.BATCH_PROMPT_PATH, 'r', encoding='utf-8') as f:
+                self.batch_prompt = f.read()
         except FileNotFoundError as e:
             raise RuntimeError(f"ERRO CRÍTICO: Arquivo de prompt não encontrado: {e.filename}")
+        # Qualquer alteração no prompt (ou no modelo) invalida naturalmente o cache.
+        self.prompt_version = hashlib.sha256(f"{self.MODEL_NAME}\n{self.main_prompt}".encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _as_image_list(image_bytes):
+        """Aceita None, os bytes de uma imagem ou uma lista de imagens (álbum)."""
+        if not image_bytes: return []
+        if isinstance(image_bytes, (bytes, bytearray)): return [image_bytes]
+        return [img for img in image_bytes if img]
+
+    def _cache_key(self, message_text, image_bytes, channel_name):
+        normalized_text = ' '.join((message_text or '').split())
+        image_digest = ','.join(hashlib.sha256(img).hexdigest() for img in self._as_image_list(image_bytes))
+        return make_key(self.prompt_version, channel_name, normalized_text, image_digest)
 
     def _clean_json_response(self, text):
         text = re.sub(r'```json\s*', '', text, flags=re.IGNORECASE)
@@ -32,24 +70,146 @@ class AIService:
             return json_match.group(0)
         return text
 
+    async def generate(self, content, timeout=None):
+        """
+        Executa `model.generate_content` no pool dedicado sem bloquear o event loop.
+        Respeita o limite de concorrência e desiste após `timeout` segundos (levanta
+        asyncio.TimeoutError). O limite vai na própria requisição HTTP: só cancelar a
+        espera deixaria a thread presa à chamada e o pool se esgotaria.
+        """
+        if self._semaphore is None:
+            # Criado sob demanda para ficar vinculado ao loop em execução.
+            self._semaphore = asyncio.Semaphore(self.config.AI_MAX_CONCURRENCY)
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.model.generate_content, content, request_options={'timeout': timeout})
+        async with self._semaphore:
+            future = loop.run_in_executor(self._executor, call)
+            try:
+                # A margem cobre só a fila do pool; quem interrompe a chamada é o timeout da requisição.
+                return await asyncio.wait_for(future, timeout=timeout + 5)
+            except google_exceptions.DeadlineExceeded as e:
+                raise asyncio.TimeoutError() from e
+
     async def analyze_and_validate(self, message_text, image_bytes, channel_name):
-        """Executa a análise e validação completa em uma única chamada de IA."""
+        """Executa a análise e validação completa em uma única chamada de IA (ou devolve o resultado em cache)."""
+        cache_key = self._cache_key(message_text, image_bytes, channel_name) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info("AI Service - Resultado encontrado no cache. Chamada ao Gemini evitada.")
+                return cached
+
+        if self.config.AI_BATCH_ENABLED and not image_bytes:
+            result = await self._analyze_in_batch(message_text, channel_name)
+        else:
+            result = await self._analyze_uncached(message_text, image_bytes, channel_name)
+        if cache_key and result.get('message_type') != 'erro_ia':
+            self.cache.set(cache_key, result)
+        return result
+
+    async def _analyze_uncached(self, message_text, image_bytes, channel_name):
         prompt = self.main_prompt.format(channel_name=channel_name)
         content = [prompt, f"\n\nAgora, analise e valide a seguinte mensagem:\n{message_text or 'Mensagem sem texto.'}"]
-        
-        if image_bytes:
-            try: 
-                content.append(Image.open(io.BytesIO(image_bytes)))
-            except Exception as e: 
+
+        for img in self._as_image_list(image_bytes):
+            try:
+                content.append(Image.open(io.BytesIO(img)))
+            except Exception as e:
                 logging.warning(f"Não foi possível processar a imagem: {e}")
 
+        cleaned_text = ""
         try:
-            response = self.model.generate_content(content)
+            response = await self.generate(content)
             cleaned_text = self._clean_json_response(response.text)
             return json.loads(cleaned_text)
         except json.JSONDecodeError:
             logging.error(f"AI Service - JSONDecodeError. Resposta da IA: {cleaned_text}")
             return {"message_type": "erro_ia", "data": {"error": "JSON inválido na resposta"}}
+        except asyncio.TimeoutError:
+            logging.error(f"AI Service - Tempo limite de {self.timeout}s excedido na API Gemini.")
+            return {"message_type": "erro_ia", "data": {"error": "Timeout na API Gemini"}}
         except Exception as e:
             logging.error(f"AI Service - Erro na API Gemini: {e}")
-            return {"message_type": "erro_ia", "data": {"error": str(e)}}
\ No newline at end of file
+            return {"message_type": "erro_ia", "data": {"error": str(e)}}
+
+    # --- Micro-lotes (apenas mensagens de texto) ---
+
+    async def _analyze_in_batch(self, message_text, channel_name):
+        """Entra no lote atual e aguarda o resultado individual desta mensagem."""
+        self._batch_seq += 1
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((f"m{self._batch_seq}", message_text, channel_name, future))
+
+        if len(self._batch) >= self.config.AI_BATCH_MAX_SIZE:
+            self._dispatch_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().call_later(
+                self.config.AI_BATCH_MAX_WAIT_MS / 1000, self._dispatch_batch
+            )
+        return await future
+
+    def _dispatch_batch(self):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch):
+        # Quem chamou pode já ter desistido (wait_for cancela o future): só resolve os que ainda esperam.
+        try:
+            await self._resolve_batch(batch)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _resolve_batch(self, batch):
+        if len(batch) == 1:
+            _, text, channel, future = batch[0]
+            result = await self._analyze_uncached(text, None, channel)
+            if not future.done():
+                future.set_result(result)
+            return
+
+        results = await self._request_batch(batch)
+        missing = [item for item in batch if not isinstance(results.get(item[0]), dict)]
+        for msg_id, _, _, future in batch:
+            if isinstance(results.get(msg_id), dict) and not future.done():
+                future.set_result(results[msg_id])
+        if missing:
+            logging.warning(f"AI Service - {len(missing)}/{len(batch)} mensagens sem resultado válido no lote. Refazendo individualmente.")
+            fallbacks = await asyncio.gather(*(self._analyze_uncached(text, None, channel) for _, text, channel, _ in missing))
+            for (_, _, _, future), result in zip(missing, fallbacks):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _request_batch(self, batch):
+        """Envia todas as mensagens do lote em uma chamada. Retorna {id: resultado} ou {} se a resposta for inválida."""
+        prompt = self.main_prompt.format(channel_name="<canal informado no cabeçalho de cada mensagem>")
+        messages = "\n\n".join(
+            f"### MENSAGEM id={msg_id} | canal={channel}\n{text or 'Mensagem sem texto.'}"
+            for msg_id, text, channel, _ in batch
+        )
+        content = [prompt, "\n\n" + self.batch_prompt, f"\n\nAgora, analise e valide as seguintes mensagens:\n\n{messages}"]
+
+        raw_text = ""
+        try:
+            response = await self.generate(content)
+            raw_text = response.text
+            cleaned = re.sub(r'```(?:json)?', '', raw_text, flags=re.IGNORECASE).strip()
+            array_match = re.search(r'\[.*\]', cleaned, re.DOTALL)
+            items = json.loads(array_match.group(0) if array_match else cleaned)
+            logging.info(f"AI Service - Lote de {len(batch)} mensagens analisado em uma única chamada.")
+            return {str(item.get('id')): item.get('result') for item in items if isinstance(item, dict)}
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            logging.error(f"AI Service - Resposta do lote malformada. Resposta da IA: {raw_text[:500]}")
+        except asyncio.TimeoutError:
+            logging.error(f"AI Service - Tempo limite de {self.timeout}s excedido no lote.")
+        except Exception as e:
+            logging.error(f"AI Service - Erro na API Gemini durante o lote: {e}")
+        return {}
@@ -0,0 +1,312 @@
+# Arquivo: app/services/api_football_client.py
+# Descrição: Cliente HTTP compartilhado da API-Football: conexões reaproveitadas (keep-alive), timeouts,
+#            novas tentativas com jitter em 429/5xx, limitador (token bucket) guiado pelos headers x-ratelimit-*
+#            e cache em disco das respostas, com TTL por endpoint, revalidação condicional e modo offline.
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from app.services.cache_service import TieredCache, make_key
+from app.services.fixtures_cache import fixtures_ttl
+
+def parse_retry_after(value):
+    """Header Retry-After em segundos ('120') ou como data HTTP; None se ausente ou inválido."""
+    if not value: return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """Token bucket thread-safe. A capacidade e o saldo são ajustados pelo que a API informa em cada resposta."""
+    def __init__(self, rate_per_minute):
+        self.capacity = max(1.0, float(rate_per_minute))
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Consome um token e retorna 0, ou retorna quantos segundos faltam para haver um."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Bloqueia (na thread atual) até haver um token disponível. Retorna o tempo esperado."""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self):
+        """Como `acquire`, mas espera no loop de eventos em vez de prender uma thread."""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def sync_with_headers(self, limit, remaining):
+        """Alinha o bucket com o limite por minuto e o saldo restante reportados pela API."""
+        with self._lock:
+            self._refill()
+            if limit and limit != self.capacity:
+                self.capacity = float(limit)
+                self.rate = self.capacity / 60.0
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+    def drain(self):
+        with self._lock:
+            self.tokens = 0
+            self._updated = time.monotonic()
+
+class ApiFootballClient:
+    BASE_URL = "https://v3.football.api-sports.io/"
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    # Respostas vencidas ficam guardadas por este tempo para revalidação, falhas de rede e modo offline.
+    STALE_RETENTION_SECONDS = 30 * 86400
+
+    def __init__(self, cfg):
+        self.config = cfg
+        self.timeout = cfg.API_FOOTBALL_TIMEOUT_SECONDS
+        self.max_retries = cfg.API_FOOTBALL_MAX_RETRIES
+        self.session = requests.Session()
+        self.session.headers.update({
+            'x-rapidapi-key': cfg.API_FOOTBALL_KEY,
+            'x-rapidapi-host': 'v3.football.api-sports.io'
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cfg.API_FOOTBALL_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.limiter = TokenBucket(cfg.API_FOOTBALL_RATE_PER_MINUTE)
+        self.daily_remaining = None
+        self._executor = ThreadPoolExecutor(max_workers=cfg.API_FOOTBALL_POOL_SIZE, thread_name_prefix="api-football")
+        self._lock = threading.Lock()   # protege os contadores, incrementados por várias threads do pool
+        self.offline = cfg.API_FOOTBALL_OFFLINE
+        self.cache = None
+        if cfg.API_CACHE_ENABLED:
+            self.cache = TieredCache(
+                cfg.API_CACHE_PATH, 'api_responses',
+                max_entries=cfg.API_CACHE_MAX_ENTRIES,
+                memory_size=cfg.API_CACHE_MEMORY_SIZE,
+                keep_stale_seconds=self.STALE_RETENTION_SECONDS,
+            )
+        self.stats = {
+            'requests': 0, 'retries': 0, 'failures': 0, 'throttled_s': 0.0,
+            'cache_hits': 0, 'cache_misses': 0, 'revalidated': 0, 'stale_served': 0, 'offline_misses': 0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    @staticmethod
+    def _int_header(headers, name):
+        try:
+            return int(headers.get(name))
+        except (TypeError, ValueError):
+            return None
+
+    def _update_limits(self, headers):
+        per_minute_limit = self._int_header(headers, 'X-RateLimit-Limit')
+        per_minute_remaining = self._int_header(headers, 'X-RateLimit-Remaining')
+        self.limiter.sync_with_headers(per_minute_limit, per_minute_remaining)
+        daily_remaining = self._int_header(headers, 'x-ratelimit-requests-remaining')
+        if daily_remaining is not None:
+            self.daily_remaining = daily_remaining
+            if daily_remaining == 0:
+                logging.critical("[API-Football] Cota diária esgotada.")
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = parse_retry_after(retry_after)
+        if delay:
+            return delay
+        return min(60.0, 2 ** attempt) * (0.5 + random.random())
+
+    @staticmethod
+    def _cache_key(endpoint, params):
+        return make_key(endpoint, sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+    def _cache_ttl(self, endpoint, params, data):
+        """TTL (segundos) de uma resposta: 0 = permanente, None = não armazenar."""
+        response = data.get('response')
+        if data.get('errors') or response is None or endpoint == 'status':
+            return None
+        cfg = self.config
+        if endpoint == 'teams':
+            if response and 'id' in (params or {}):
+                return 0
+            return cfg.API_CACHE_TEAMS_TTL_DAYS * 86400 if response else cfg.API_CACHE_DEFAULT_TTL_SECONDS
+        if endpoint in ('leagues', 'countries', 'timezone'):
+            return cfg.API_CACHE_LEAGUES_TTL_DAYS * 86400
+        if endpoint == 'fixtures':
+            ttl = fixtures_ttl(response, cfg)
+            return 0 if ttl is None else ttl
+        return cfg.API_CACHE_DEFAULT_TTL_SECONDS
+
+    def _store(self, key, endpoint, params, data, headers):
+        ttl = self._cache_ttl(endpoint, params, data)
+        if ttl is None: return
+        self.cache.set(key, {
+            'data': data,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }, ttl_seconds=ttl)
+
+    def get(self, endpoint, params=None, use_cache=True):
+        """
+        Faz um GET e retorna o JSON completo (dict), ou None após esgotar as tentativas.
+        Síncrono: usado diretamente pelos scripts e, via `aget`, pelos serviços assíncronos.
+        Respostas válidas no cache não consomem cota; vencidas são revalidadas (If-None-Match /
+        If-Modified-Since) quando a API enviou validadores, e servidas como último recurso se a rede falhar.
+        """
+        key, cached, answered, data = self._lookup(endpoint, params, use_cache)
+        if answered:
+            return data
+        return self._fetch(endpoint, params, key, cached)
+
+    def _lookup(self, endpoint, params, use_cache):
+        """
+        Parte local de `get`: cache e modo offline. Retorna (chave, entrada em cache, respondido, dados);
+        com `respondido` verdadeiro, `dados` é a resposta final e nenhuma requisição é necessária.
+        """
+        key = cached = None
+        if use_cache and self.cache:
+            key = self._cache_key(endpoint, params)
+            cached, fresh = self.cache.get_with_staleness(key)
+            if cached is not None and fresh:
+                self._count(cache_hits=1)
+                return key, cached, True, cached['data']
+            self._count(cache_misses=1)
+
+        if self.offline:
+            if cached is not None:
+                self._count(stale_served=1)
+                return key, cached, True, cached['data']
+            self._count(offline_misses=1)
+            print(f"  -> [API] Modo offline: '{endpoint}' com {params} não está no cache.")
+            return key, cached, True, None
+        return key, cached, False, None
+
+    def _fetch(self, endpoint, params, key, cached, token_ready=False):
+        """Parte de rede de `get`: requisita, guarda no cache e, se a rede falhar, serve a entrada vencida."""
+        data, headers = self._request(endpoint, params, cached, token_ready)
+        if data is None:
+            if cached is not None:
+                self._count(stale_served=1)
+                print(f"  -> [API] Usando resposta vencida do cache para '{endpoint}' com {params}.")
+                return cached['data']
+            return None
+        if key is not None:
+            self._store(key, endpoint, params, data, headers)
+        return data
+
+    def _request(self, endpoint, params, cached=None, token_ready=False):
+        """
+        Executa o GET com novas tentativas. Retorna (json, headers) ou (None, None).
+        `token_ready`: o token da primeira tentativa já foi obtido por quem chamou (ver `aget`).
+        """
+        url = f"{self.BASE_URL}{endpoint}"
+        conditional = {}
+        if cached:
+            if cached.get('etag'): conditional['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'): conditional['If-Modified-Since'] = cached['last_modified']
+        for attempt in range(self.max_retries + 1):
+            if attempt or not token_ready:
+                self._count(throttled_s=self.limiter.acquire())
+            self._count(requests=1)
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, headers=conditional, timeout=self.timeout)
+                self._update_limits(response.headers)
+                if response.status_code == 304 and cached:
+                    self._count(revalidated=1)
+                    return cached['data'], response.headers
+                if response.status_code in self.RETRY_STATUS:
+                    retry_after = response.headers.get('Retry-After')
+                    reason = f"HTTP {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+                    errors = data.get('errors')
+                    # A API responde 200 com {"errors": {"rateLimit": ...}} quando o limite por minuto estoura.
+                    if isinstance(errors, dict) and 'rateLimit' in errors:
+                        self.limiter.drain()
+                        reason = f"rateLimit: {errors['rateLimit']}"
+                    else:
+                        return data, response.headers
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                reason = str(e)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"  -> [API] Erro ao chamar '{endpoint}' com {params}: {e}")
+                self._count(failures=1)
+                return None, None
+
+            if attempt == self.max_retries: break
+            delay = self._backoff(attempt, retry_after)
+            self._count(retries=1)
+            print(f"  -> [API] '{endpoint}' falhou ({reason}). Nova tentativa em {delay:.1f}s...")
+            time.sleep(delay)
+
+        self._count(failures=1)
+        print(f"  -> [API] Desistindo de '{endpoint}' com {params} após {self.max_retries + 1} tentativas.")
+        return None, None
+
+    def stats_summary(self):
+        with self._lock:
+            s = dict(self.stats)
+        lookups = s['cache_hits'] + s['cache_misses']
+        hit_rate = s['cache_hits'] / lookups if lookups else 0.0
+        return (f"[API-Football] Requisições: {s['requests']} | Cache: {s['cache_hits']}/{lookups} ({hit_rate:.0%}) | "
+                f"Revalidadas: {s['revalidated']} | Vencidas servidas: {s['stale_served']} | "
+                f"Falhas: {s['failures']} | Espera no limitador: {s['throttled_s']:.1f}s")
+
+    async def aget(self, endpoint, params=None, use_cache=True):
+        """
+        Versão assíncrona de `get`. Acertos de cache e o modo offline respondem direto no loop; a espera
+        pelo limitador também acontece no loop, e só a requisição em si ocupa uma thread do pool.
+        """
+        key, cached, answered, data = self._lookup(endpoint, params, use_cache)
+        if answered:
+            return data
+        self._count(throttled_s=await self.limiter.acquire_async())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._fetch, endpoint, params, key, cached, True)
+
+_shared_client = None
+
+def get_client(cfg):
+    """Instância única por processo, para que todos compartilhem o pool de conexões e o limitador."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = ApiFootballClient(cfg)
+    return _shared_client
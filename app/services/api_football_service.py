@@ -1,44 +1,74 @@
 # Arquivo: app/services/api_football_service.py
-# Versão: 8.0 - Lógica de busca de partidas robusta com intervalo de datas para resolver problemas de fuso horário.
+# Versão: 9.0 - Competição (dica da IA ou do texto) restringe a busca ao elenco da liga na temporada do jogo.
+#         Liga identificada por nome + país; o elenco nunca substitui um ID já mapeado que encontra a partida.
 
-import requests
 import re
-import json
 import os
 import asyncio
+import time
 from datetime import datetime, timedelta
 from app.config import Config
 from app.services.ai_service import AIService
+from app.services.team_mapping_store import TeamMappingStore
+from app.services.league_mapping_store import LeagueMappingStore
+from app.services.api_football_client import get_client
+from app.services.fixtures_cache import FixturesCache
+from app.services.team_name_index import FuzzyTeamIndex, fold_name
 
 class ApiFootballService:
+    FIXTURE_IDS_PER_REQUEST = 20  # limite do parâmetro `ids` em /fixtures
+
     def __init__(self, cfg: Config, ai_svc: AIService):
         self.config = cfg
         self.ai = ai_svc 
-        self.base_url = "https://v3.football.api-sports.io/"
-        self.headers = {
-            'x-rapidapi-key': self.config.API_FOOTBALL_KEY,
-            'x-rapidapi-host': 'v3.football.api-sports.io'
-        }
+        self.http = get_client(self.config)
+        self.fixtures = FixturesCache(self.http, self.config)
         self.mappings_filepath = os.path.join(self.config.MAPPINGS_DIR, 'team_mappings.json')
-        self.team_mappings = self._load_team_mappings()
+        # Ambos os índices só abrem o banco (e, se mudou, reimportam o JSON) na primeira consulta.
+        self.mapping_store = TeamMappingStore(self.config.TEAM_MAPPINGS_DB_PATH, self.mappings_filepath)
+        self.league_store = LeagueMappingStore(
+            self.config.LEAGUE_MAPPINGS_DB_PATH, os.path.join(self.config.MAPPINGS_DIR, 'league_mappings.json')
+        )
+        self._name_index = None
+        self._league_index = None
+        self._league_names = None
+        self._league_migration = None   # Future da migração do league_mappings.json antigo (uma vez por processo)
+        self._league_seasons = {}   # league_id -> Future com a lista de temporadas
+        self._rosters = {}          # (league_id, temporada) -> Future com (IDs do elenco, índice aproximado)
+        self._inflight = {}   # nome limpo -> Future da resolução em andamento
         self.ignore_list = ["adversário", "oponente", "time a", "time b", "?", "", "none"]
+        # Variações de placeholders que nunca serão um time ("adversário (fora)", "oponente a definir"...).
+        self.ignore_re = re.compile(r'^(?:adversario|oponente|time [ab]|a definir|none|jogador)\b')
 
-    def _load_team_mappings(self):
-        if os.path.exists(self.mappings_filepath):
-            try:
-                with open(self.mappings_filepath, 'r', encoding='utf-8') as f:
-                    print("Mapa de IDs de times local carregado.")
-                    return {k.lower(): v for k, v in json.load(f).items()}
-            except json.JSONDecodeError: return {}
-        return {}
+    @property
+    def name_index(self):
+        """Índice aproximado sobre todos os nomes conhecidos, construído no primeiro nome desconhecido."""
+        if self._name_index is None:
+            self._name_index = FuzzyTeamIndex(threshold=self.config.TEAM_FUZZY_THRESHOLD)
+            self._name_index.add_many(self.mapping_store.resolved_items())
+        return self._name_index
 
-    def _save_team_mappings(self):
+    def _save_team_mappings(self, new_entries):
+        """Persiste apenas os aliases novos; cada gravação é atômica e segura entre processos."""
+        if self._name_index is not None:
+            self._name_index.add_many(new_entries)
         try:
-            with open(self.mappings_filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.team_mappings, f, indent=4, ensure_ascii=False)
+            self.mapping_store.set_many(new_entries)
         except Exception as e:
             print(f"ERRO ao salvar o mapa de IDs de times: {e}")
 
+    def _is_ignored(self, clean_name):
+        return not clean_name or clean_name in self.ignore_list or bool(self.ignore_re.match(fold_name(clean_name)))
+
+    def _negative_is_fresh(self, clean_name):
+        """True se o nome falhou recentemente e ainda não chegou a hora de tentar de novo."""
+        negative = self.mapping_store.get_negative(clean_name)
+        if not negative: return False
+        updated_at, attempts = negative
+        ttl = min(self.config.TEAM_NEGATIVE_TTL_HOURS * 3600 * 2 ** (attempts - 1),
+                  self.config.TEAM_NEGATIVE_MAX_TTL_DAYS * 86400)
+        return time.time() - updated_at < ttl
+
     def _clean_name_for_lookup(self, name):
         if not isinstance(name, str): return ""
         # Remove sufixos como [W] ou (F) para a busca inicial
@@ -61,8 +91,7 @@ class ApiFootballService:
         Agora, converta o seguinte nome: '{raw_name}'
         """
         try:
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(None, lambda: self.ai.model.generate_content(prompt))
+            response = await self.ai.generate(prompt, timeout=30)
             return response.text.strip().lower()
         except Exception as e:
             print(f"  -> Erro na IA ao padronizar nome '{raw_name}': {e}")
@@ -81,23 +110,47 @@ class ApiFootballService:
     async def _search_team_on_api(self, search_term):
         if not search_term: return None
         print(f"     -> DEBUG API: Buscando na API pelo termo: '{search_term}'")
-        try:
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.get(f"{self.base_url}teams", headers=self.headers, params={'search': search_term}, timeout=20)
-            )
-            response.raise_for_status()
-            return response.json().get('response', [])[0] if response.json().get('response') else None
-        except requests.exceptions.RequestException as e:
-            print(f"  -> [API] Erro de rede ao buscar por '{search_term}': {e}")
-            return None
-            
+        data = await self.http.aget('teams', {'search': search_term})
+        results = data.get('response') if data else None
+        return results[0] if results else None
+
+    def _mapped_team_id(self, team_name):
+        """ID já conhecido para o nome (consulta indexada no SQLite), sem IA nem API."""
+        clean_name = self._clean_name_for_lookup(team_name)
+        if self._is_ignored(clean_name): return None
+        return self.mapping_store.get(clean_name)[1]
+
     async def _get_team_id(self, team_name):
         clean_name = self._clean_name_for_lookup(team_name)
-        if not clean_name or clean_name in self.ignore_list: return None
-        if clean_name in self.team_mappings and self.team_mappings.get(clean_name) is not None:
-            return self.team_mappings[clean_name]
+        if self._is_ignored(clean_name): return None
+        # Consulta indexada no SQLite: enxerga também o que outros processos (results_updater, auditor) aprenderam.
+        _, team_id = self.mapping_store.get(clean_name)
+        if team_id is not None:
+            return team_id
+
+        # Single-flight: buscas simultâneas pelo mesmo nome aguardam a mesma resolução.
+        inflight = self._inflight.get(clean_name)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._resolve_team_id(clean_name))
+            self._inflight[clean_name] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(clean_name, None))
+        else:
+            print(f"  -> Resolução de '{clean_name}' já em andamento. Aguardando o resultado compartilhado.")
+        return await asyncio.shield(inflight)
+
+    async def _resolve_team_id(self, clean_name):
+        # Variações de grafia ("Grêmio" x "gremio", "Atlético-MG" x "atletico mg") resolvidas localmente.
+        fuzzy_match = self.name_index.best_match(clean_name)
+        if fuzzy_match:
+            team_id, score, matched_name = fuzzy_match
+            # Não vira alias ainda: só depois que uma partida confirmar o ID (ver find_match_by_name).
+            print(f"  -> Nome '{clean_name}' resolvido localmente como '{matched_name}' (ID {team_id}, score {score:.2f}).")
+            return team_id
+
+        # Nome que falhou recentemente: não gasta IA nem cota da API até o TTL (com backoff) expirar.
+        if self._negative_is_fresh(clean_name):
+            print(f"  -> '{clean_name}' está no cache negativo. Pulando nova busca.")
+            return None
         
         # Estratégia 1: Usa a IA para obter o nome padronizado
         standardized_name = await self._get_standardized_name_with_ai(clean_name)
@@ -111,20 +164,173 @@ class ApiFootballService:
             found_team = await self._search_team_on_api(clean_name)
 
         if not found_team:
-            print(f"  -> Nenhum resultado na API para '{clean_name}' ou suas variações.")
-            self.team_mappings[clean_name] = None
-            self._save_team_mappings()
+            attempts = self.mapping_store.record_negative(clean_name)
+            print(f"  -> Nenhum resultado na API para '{clean_name}' ou suas variações (tentativa {attempts}).")
             return None
         
         team_id = found_team['team']['id']
         api_official_name = found_team['team']['name']
         print(f"  -> SUCESSO! ID {team_id} encontrado para '{api_official_name}'.")
-        self.team_mappings[clean_name] = team_id
-        self.team_mappings[standardized_name] = team_id
-        self.team_mappings[self._clean_name_for_lookup(api_official_name)] = team_id
-        self._save_team_mappings()
+        self._save_team_mappings({
+            clean_name: team_id,
+            standardized_name: team_id,
+            self._clean_name_for_lookup(api_official_name): team_id,
+        })
         return team_id
 
+    # --- Competição (liga) ---
+
+    @property
+    def league_index(self):
+        """Índice aproximado dos nomes de ligas, construído na primeira dica que não bate exatamente."""
+        if self._league_index is None:
+            # O índice só corrige a grafia do nome; a liga sai de (nome, país) no league_store.
+            self._league_index = FuzzyTeamIndex(threshold=self.config.TEAM_FUZZY_THRESHOLD)
+            self._league_index.add_many((name, name) for name in self.league_store.names())
+        return self._league_index
+
+    def _league_from_text(self, text):
+        """
+        Procura no texto o nome (com duas ou mais palavras) de liga mais longo citado literalmente.
+        Só nomes de uma única liga: "Premier League" no texto não diz de qual país é.
+        """
+        if self._league_names is None:
+            names = {(fold_name(name), league_id) for name, league_id in self.league_store.unambiguous_items()}
+            self._league_names = sorted((n for n in names if len(n[0].split()) >= 2), key=lambda n: -len(n[0]))
+        folded = f" {fold_name(text)} "
+        return next((league_id for name, league_id in self._league_names if f" {name} " in folded), None)
+
+    async def _search_league_on_api(self, competition, country):
+        data = await self.http.aget('leagues', {'name': competition, 'country': country})
+        response = (data or {}).get('response') or []
+        return response[0]['league']['id'] if len(response) == 1 else None
+
+    async def _fetch_league_countries(self):
+        """{league_id: país} de todas as ligas da API (uma listagem, guardada pelo cache HTTP)."""
+        countries, page, total_pages = {}, 1, 1
+        while page <= total_pages:
+            data = await self.http.aget('leagues', {'page': page} if page > 1 else None)
+            if not data: break
+            for item in data.get('response') or []:
+                countries[item['league']['id']] = (item.get('country') or {}).get('name') or ''
+            total_pages = (data.get('paging') or {}).get('total', 1)
+            page += 1
+        return countries
+
+    async def _migrate_legacy_leagues(self):
+        """
+        O league_mappings.json antigo é chaveado só pelo nome, sem país, e suas entradas nunca casam.
+        Completa o país pelo ID das ligas; o build_league_map gera o arquivo já no formato novo.
+        """
+        legacy = self.league_store.legacy_ids()
+        if not legacy: return
+        countries = await self._fetch_league_countries()
+        migrated = self.league_store.assign_countries({i: countries[i] for i in legacy if i in countries})
+        self._league_index = self._league_names = None
+        print(f"  -> [Ligas] {migrated}/{len(legacy)} ligas do formato antigo migradas para (nome, país). "
+              f"Rode o build_league_map para atualizar o league_mappings.json.")
+
+    async def _match_league_id(self, competition=None, country=None, text=None):
+        if self._league_migration is None:
+            self._league_migration = asyncio.ensure_future(self._migrate_legacy_leagues())
+        try:
+            await asyncio.shield(self._league_migration)
+        except Exception as e:
+            print(f"  -> [Ligas] Erro ao migrar o mapa de ligas do formato antigo: {e}")
+        if competition:
+            row = self.league_store.get(competition, country)
+            if not row:
+                fuzzy_match = self.league_index.best_match(competition)
+                row = self.league_store.get(fuzzy_match[0], country) if fuzzy_match else None
+            if row: return row[0]
+            if country:
+                league_id = await self._search_league_on_api(competition, country)
+                if league_id: return league_id
+        return self._league_from_text(text) if text else None
+
+    async def _fetch_league_seasons(self, league_id):
+        data = await self.http.aget('leagues', {'id': league_id})
+        response = (data or {}).get('response') or []
+        return response[0].get('seasons', []) if response else []
+
+    async def _season_for(self, league_id, event_date):
+        """Temporada da liga que contém `event_date` (ou a atual). A lista é cacheada por liga."""
+        task = self._league_seasons.get(league_id)
+        if task is None:
+            task = self._league_seasons[league_id] = asyncio.ensure_future(self._fetch_league_seasons(league_id))
+        seasons = await asyncio.shield(task)
+        if not seasons:
+            self._league_seasons.pop(league_id, None)
+            return None
+        day = event_date.strftime('%Y-%m-%d') if event_date else None
+        for season in seasons:
+            if day and season.get('start', '') <= day <= season.get('end', ''):
+                return season['year']
+        current = next((s for s in seasons if s.get('current')), seasons[-1])
+        return current['year']
+
+    async def resolve_competition(self, competition=None, text=None, event_date=None, country=None):
+        """Traduz a dica de competição (da IA ou do texto da mensagem) em (league_id, temporada), ou None."""
+        league_id = await self._match_league_id(competition, country, text)
+        if not league_id: return None
+        season = await self._season_for(league_id, event_date)
+        if not season: return None
+        print(f"  -> Competição identificada: liga {league_id}, temporada {season}.")
+        return league_id, season
+
+    async def _fetch_roster(self, league):
+        league_id, season = league
+        data = await self.http.aget('teams', {'league': league_id, 'season': season})
+        teams = (data or {}).get('response') or []
+        if not teams:
+            self._rosters.pop(league, None)
+            return None
+        index = FuzzyTeamIndex(threshold=self.config.LEAGUE_ROSTER_FUZZY_THRESHOLD)
+        index.add_many((item['team']['name'], item['team']['id']) for item in teams)
+        return {item['team']['id'] for item in teams}, index
+
+    async def _roster_team_id(self, team_name, league):
+        """ID do time no elenco da liga na temporada, se houver correspondência confiável; senão None."""
+        clean_name = self._clean_name_for_lookup(team_name)
+        if self._is_ignored(clean_name): return None
+        roster = await self._get_roster(league)
+        if not roster: return None
+        roster_ids, roster_index = roster
+        _, team_id = self.mapping_store.get(clean_name)
+        if team_id in roster_ids: return team_id
+        roster_match = roster_index.best_match(clean_name)
+        if not roster_match: return None
+        match_id, score, matched_name = roster_match
+        print(f"  -> '{clean_name}' casado com '{matched_name}' no elenco da liga {league[0]} (ID {match_id}, score {score:.2f}).")
+        return match_id
+
+    async def _get_roster(self, league):
+        """Elenco (IDs e índice aproximado) da liga na temporada; uma busca por processo, disco via cache HTTP."""
+        task = self._rosters.get(league)
+        if task is None:
+            task = self._rosters[league] = asyncio.ensure_future(self._fetch_roster(league))
+        return await asyncio.shield(task)
+
+    async def _find_in_league_fixtures(self, home_name, away_name, league, dates):
+        """Casa os nomes contra os times das partidas da liga nas datas, sem busca de times na API."""
+        for date_for_api in dates:
+            day = await self.fixtures.get_day(date_for_api)
+            if not day: continue
+            league_fixtures = [f for f in day.by_pair.values() if f.get('league', {}).get('id') == league[0]]
+            if not league_fixtures: continue
+            index = FuzzyTeamIndex(threshold=self.config.LEAGUE_ROSTER_FUZZY_THRESHOLD)
+            for fixture in league_fixtures:
+                index.add(fixture['teams']['home']['name'], fixture['teams']['home']['id'])
+                index.add(fixture['teams']['away']['name'], fixture['teams']['away']['id'])
+            home_match = index.best_match(self._clean_name_for_lookup(home_name))
+            away_match = index.best_match(self._clean_name_for_lookup(away_name))
+            if home_match and away_match:
+                fixture = day.by_pair.get((home_match[0], away_match[0]))
+                if fixture:
+                    print(f"       -> SUCESSO: Partida encontrada entre os jogos da liga {league[0]} em {date_for_api}.")
+                    return fixture
+        return None
+
     def _parse_event(self, event_description):
         if not isinstance(event_description, str) or not event_description.strip():
             return None, "InvalidDescription"
@@ -136,48 +342,112 @@ class ApiFootballService:
                     return (teams[0].strip(), teams[1].strip()), "Success"
         return None, "ParseError"
 
-    async def find_match_by_ids(self, home_id: int, away_id: int, event_date_str: str):
-        if not all([home_id, away_id, event_date_str]): return None, "InvalidInput"
+    def _candidate_dates(self, event_date_str):
+        """Data do evento, dia anterior e dia seguinte (cobre fusos horários), no formato da API; None se inválida."""
         try:
             parsed_date_str = self._parse_relative_date(event_date_str)
             base_date = datetime.strptime(parsed_date_str.split(" ")[0], '%d/%m/%Y')
         except (ValueError, IndexError):
             print(f"  -> Data do evento '{event_date_str}' inválida.")
-            return None, "InvalidDate"
+            return None
+        return [d.strftime('%Y-%m-%d') for d in (base_date, base_date - timedelta(days=1), base_date + timedelta(days=1))]
 
-        # NOVA LÓGICA: Busca na data exata, no dia anterior e no dia seguinte para cobrir fusos horários.
-        date_range_to_check = [
-            base_date,
-            base_date - timedelta(days=1),
-            base_date + timedelta(days=1)
-        ]
+    async def find_match_by_ids(self, home_id: int, away_id: int, event_date_str: str):
+        if not all([home_id, away_id, event_date_str]): return None, "InvalidInput"
+        date_range_to_check = self._candidate_dates(event_date_str)
+        if not date_range_to_check: return None, "InvalidDate"
 
-        for event_date in date_range_to_check:
-            date_for_api = event_date.strftime('%Y-%m-%d')
+        for date_for_api in date_range_to_check:
             print(f"     -> DEBUG: Procurando partida com IDs {home_id} vs {away_id} na data {date_for_api}")
-            try:
-                params = {'date': date_for_api, 'team': home_id}
-                response = await asyncio.get_running_loop().run_in_executor(
-                    None, lambda: requests.get(f"{self.base_url}fixtures", headers=self.headers, params=params, timeout=20)
-                )
-                response.raise_for_status()
-                for fixture in response.json().get('response', []):
-                    if fixture['teams']['away']['id'] == away_id:
-                        print(f"       -> SUCESSO: Partida encontrada na data {date_for_api}.")
-                        return fixture, "Success"
-            except requests.exceptions.RequestException as e:
-                print(f"  -> [API] Erro na requisição ao buscar por IDs na data {date_for_api}: {e}")
-                # Não retorna aqui, continua para a próxima data do loop
+            fixture = await self.fixtures.find(date_for_api, home_id, away_id)
+            if fixture:
+                print(f"       -> SUCESSO: Partida encontrada na data {date_for_api}.")
+                return fixture, "Success"
         
         print(f"     -> Partida não encontrada no intervalo de 3 dias para os IDs {home_id} vs {away_id}.")
         return None, "MatchNotFound"
 
 
-    async def find_match_by_name(self, event_description: str, event_date_str: str):
+    async def get_fixtures_by_ids(self, fixture_ids):
+        """Busca várias partidas pelo ID, em lotes de até 20 por requisição. Retorna {fixture_id: fixture}."""
+        unique_ids = sorted({int(fid) for fid in fixture_ids})
+        chunks = [unique_ids[i:i + self.FIXTURE_IDS_PER_REQUEST] for i in range(0, len(unique_ids), self.FIXTURE_IDS_PER_REQUEST)]
+        responses = await asyncio.gather(*(self.http.aget('fixtures', {'ids': '-'.join(map(str, chunk))}) for chunk in chunks))
+        fixtures = {}
+        for data in responses:
+            for fixture in (data or {}).get('response', []):
+                fixtures[fixture['fixture']['id']] = fixture
+        print(f"  -> {len(fixtures)}/{len(unique_ids)} partidas obtidas em {len(chunks)} requisições.")
+        return fixtures
+
+    async def find_match_by_name(self, event_description: str, event_date_str: str, competition=None,
+                                 message_text=None, competition_country=None):
+        """
+        `competition` (nome da liga informado pela IA, com `competition_country`) e `message_text`
+        são dicas opcionais. Com a liga identificada, o elenco da temporada resolve nomes ainda sem
+        ID (sem IA nem busca na API) e desempata homônimos (principal x sub-21 x feminino x B), mas
+        um ID já mapeado sempre é tentado primeiro e só é trocado se a partida não for encontrada.
+        """
         parsed_teams, reason = self._parse_event(event_description)
         if not parsed_teams: return None, reason
         home_team_name, away_team_name = parsed_teams
-        home_team_id = await self._get_team_id(home_team_name)
-        away_team_id = await self._get_team_id(away_team_name)
-        if not home_team_id or not away_team_id: return None, "TeamNotFound"
-        return await self.find_match_by_ids(home_team_id, away_team_id, event_date_str)
\ No newline at end of file
+
+        league = None
+        dates = self._candidate_dates(event_date_str) if (competition or message_text) else None
+        if dates:
+            league = await self.resolve_competition(
+                competition, message_text, datetime.strptime(dates[0], '%Y-%m-%d'), country=competition_country
+            )
+
+        home_mapped, away_mapped = self._mapped_team_id(home_team_name), self._mapped_team_id(away_team_name)
+        home_roster = away_roster = None
+        if league:
+            home_roster, away_roster = await asyncio.gather(
+                self._roster_team_id(home_team_name, league), self._roster_team_id(away_team_name, league)
+            )
+
+        tried = {}   # (home_id, away_id) -> (partida, razão)
+        async def try_ids(home_id, away_id):
+            if not (home_id and away_id): return None
+            if (home_id, away_id) not in tried:
+                tried[(home_id, away_id)] = await self.find_match_by_ids(home_id, away_id, event_date_str)
+            return tried[(home_id, away_id)][0]
+
+        def learn_unmapped(fixture):
+            # Um nome casado pelo elenco, pelo índice aproximado ou pelas partidas da liga só vira alias
+            # depois que a partida confirma o ID.
+            learned = {}
+            for name, mapped, side in ((home_team_name, home_mapped, 'home'), (away_team_name, away_mapped, 'away')):
+                clean_name = self._clean_name_for_lookup(name)
+                if mapped is None and not self._is_ignored(clean_name):
+                    learned[clean_name] = fixture['teams'][side]['id']
+            if learned: self._save_team_mappings(learned)
+
+        # 1) IDs mapeados; o elenco só completa os nomes ainda sem ID.
+        # 2) Se a partida não aparece, o elenco desempata um homônimo mapeado errado.
+        for home_id, away_id in ((home_mapped or home_roster, away_mapped or away_roster),
+                                 (home_roster or home_mapped, away_roster or away_mapped)):
+            fixture = await try_ids(home_id, away_id)
+            if fixture:
+                learn_unmapped(fixture)
+                return fixture, "Success"
+
+        # 3) Resolução completa (índice local, IA e API), como sem a dica de liga.
+        home_team_id, away_team_id = await asyncio.gather(
+            self._get_team_id(home_team_name), self._get_team_id(away_team_name)
+        )
+        fixture = await try_ids(home_team_id, away_team_id)
+        if fixture:
+            learn_unmapped(fixture)   # inclui nomes casados só pelo índice aproximado
+            return fixture, "Success"
+
+        # 4) Times da liga entre as partidas do dia, casados pelo nome.
+        if league:
+            fixture = await self._find_in_league_fixtures(home_team_name, away_team_name, league, dates)
+            if fixture:
+                learn_unmapped(fixture)
+                return fixture, "Success"
+
+        if home_team_id and away_team_id:
+            return None, tried[(home_team_id, away_team_id)][1]
+        return None, "TeamNotFound"
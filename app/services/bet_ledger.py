@@ -0,0 +1,239 @@
+# Arquivo: app/services/bet_ledger.py
+# Descrição: Registro local (SQLite) de todas as apostas e mudanças de status, com outbox para o Google Sheets.
+
+import sqlite3
+import os
+import json
+import logging
+import threading
+import time
+from app.services.sheet_mirror import parse_event_time
+
+class BetLedger:
+    """
+    Fonte da verdade das apostas. Cada inclusão ou mudança de status é gravada aqui e,
+    na MESMA transação, vira uma operação no outbox; a planilha é só uma visão, atualizada
+    depois pelo replicador. Assim, ingestão e liquidação nunca esperam pelo Google, e uma
+    queda do Sheets apenas atrasa a visão. Processos no mesmo host compartilham o arquivo (WAL).
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS bets (
+                    bet_id TEXT PRIMARY KEY,
+                    record TEXT NOT NULL,
+                    situacao TEXT,
+                    event_time TEXT,
+                    archived_to TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_bets_situacao ON bets (situacao, event_time)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS bet_transitions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    bet_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    old_value TEXT,
+                    new_value TEXT,
+                    source TEXT NOT NULL,
+                    at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_transitions_bet ON bet_transitions (bet_id)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    op TEXT NOT NULL,
+                    bet_id TEXT,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    claimed_by TEXT,
+                    claimed_until REAL,
+                    dead INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
+    # --- Apostas ---
+
+    def _save(self, bet_id, record, now, created=False):
+        situacao = str(record.get('Situação', '')).strip().lower()
+        event_time = parse_event_time(record.get('Data Completa'), bet_id)
+        if created:
+            self._conn.execute(
+                'INSERT INTO bets (bet_id, record, situacao, event_time, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (bet_id, json.dumps(record, ensure_ascii=False), situacao, event_time, now, now)
+            )
+        else:
+            self._conn.execute(
+                'UPDATE bets SET record = ?, situacao = ?, event_time = ?, updated_at = ? WHERE bet_id = ?',
+                (json.dumps(record, ensure_ascii=False), situacao, event_time, now, bet_id)
+            )
+
+    def _transition(self, bet_id, field, old_value, new_value, source, now):
+        self._conn.execute(
+            'INSERT INTO bet_transitions (bet_id, field, old_value, new_value, source, at) VALUES (?, ?, ?, ?, ?, ?)',
+            (bet_id, field, None if old_value is None else str(old_value), str(new_value), source, now)
+        )
+
+    def _enqueue(self, op, bet_id, payload, now):
+        return self._conn.execute(
+            'INSERT INTO outbox (op, bet_id, payload, created_at) VALUES (?, ?, ?, ?)',
+            (op, bet_id, json.dumps(payload, ensure_ascii=False), now)
+        ).lastrowid
+
+    def add_bet(self, record, ordered_row):
+        """Registra uma aposta nova e agenda sua inclusão na planilha. Retorna o id da operação no outbox."""
+        bet_id = record['Bet ID']
+        now = time.time()
+        with self._lock, self._conn:
+            self._save(bet_id, record, now, created=True)
+            self._transition(bet_id, 'Situação', None, record.get('Situação', ''), 'ingestao', now)
+            return self._enqueue('append', bet_id, {'row': ordered_row}, now)
+
+    def update_fields(self, bet_id, changes, source='liquidacao'):
+        """Altera campos de uma aposta (ex.: Situação, Fixture ID) e agenda a atualização na planilha."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT record FROM bets WHERE bet_id = ?', (bet_id,)).fetchone()
+            if not row:
+                logging.warning(f"[Ledger] Aposta '{bet_id}' desconhecida. Atualização ignorada.")
+                return None
+            record = json.loads(row[0])
+            for field, value in changes.items():
+                self._transition(bet_id, field, record.get(field), value, source, now)
+                record[field] = value
+            self._save(bet_id, record, now)
+            return self._enqueue('update', bet_id, {'changes': changes}, now)
+
+    def adopt(self, records):
+        """
+        Incorpora apostas vistas na planilha (criadas por outro processo ou editadas à mão).
+        Apostas com operações ainda pendentes no outbox são ignoradas: aqui a versão local é a mais nova.
+        """
+        now = time.time()
+        adopted = 0
+        with self._lock, self._conn:
+            pending = {r[0] for r in self._conn.execute('SELECT DISTINCT bet_id FROM outbox WHERE bet_id IS NOT NULL')}
+            for record in records:
+                record = {k: v for k, v in record.items() if k != 'row_number'}
+                bet_id = str(record.get('Bet ID', '')).strip()
+                if not bet_id or bet_id in pending: continue
+                row = self._conn.execute('SELECT record FROM bets WHERE bet_id = ?', (bet_id,)).fetchone()
+                if row is None:
+                    self._save(bet_id, record, now, created=True)
+                    self._transition(bet_id, 'Situação', None, record.get('Situação', ''), 'planilha', now)
+                    adopted += 1
+                    continue
+                current = json.loads(row[0])
+                if current == record: continue
+                for field, value in record.items():
+                    if current.get(field) != value:
+                        self._transition(bet_id, field, current.get(field), value, 'planilha', now)
+                self._save(bet_id, record, now)
+                adopted += 1
+        if adopted:
+            logging.info(f"[Ledger] {adopted} apostas incorporadas/atualizadas a partir da planilha.")
+        return adopted
+
+    def request_archive(self):
+        """Agenda o arquivamento mensal; roda depois das atualizações já enfileiradas (ordem do outbox)."""
+        with self._lock, self._conn:
+            return self._enqueue('archive', None, {}, time.time())
+
+    def mark_archived(self, archived):
+        """`archived` = {bet_id: nome da aba mensal}."""
+        now = time.time()
+        with self._lock, self._conn:
+            for bet_id, sheet_name in archived.items():
+                self._conn.execute('UPDATE bets SET archived_to = ?, updated_at = ? WHERE bet_id = ?', (sheet_name, now, bet_id))
+                self._transition(bet_id, 'Aba', None, sheet_name, 'arquivamento', now)
+
+    def _records(self, where, params=()):
+        with self._lock:
+            rows = self._conn.execute(f'SELECT record FROM bets {where} ORDER BY created_at', params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def pending_before(self, check_time):
+        """Apostas 'pendente', ainda na aba principal, com evento anterior a `check_time`."""
+        return self._records(
+            "WHERE situacao = 'pendente' AND archived_to IS NULL AND event_time IS NOT NULL AND event_time <= ?",
+            (check_time.strftime('%Y-%m-%d %H:%M'),)
+        )
+
+    # --- Outbox ---
+    # Qualquer processo que compartilhe o arquivo pode replicar qualquer operação: elas são
+    # reservadas por um prazo (lease) e devolvidas à fila em caso de falha ou queda.
+    # Falhas temporárias (queda do Google, cota) nunca descartam uma operação; só erros
+    # permanentes, depois de MAX_ATTEMPTS, e mesmo essas podem ser reativadas (`revive_dead`).
+
+    MAX_ATTEMPTS = 5
+
+    def outbox_count(self):
+        """Operações disponíveis para replicação (não reservadas por outro processo e não descartadas)."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM outbox WHERE dead = 0 AND (claimed_until IS NULL OR claimed_until < ?)', (time.time(),)
+            ).fetchone()[0]
+
+    def claim_outbox(self, owner, limit, lease_seconds=300):
+        """Reserva as operações mais antigas disponíveis: [(id, op, bet_id, payload)], em ordem."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('''
+                UPDATE outbox SET claimed_by = ?, claimed_until = ? WHERE id IN (
+                    SELECT id FROM outbox WHERE dead = 0 AND (claimed_until IS NULL OR claimed_until < ?)
+                    ORDER BY id LIMIT ?
+                )
+            ''', (owner, now + lease_seconds, now, limit))
+            rows = self._conn.execute(
+                'SELECT id, op, bet_id, payload FROM outbox WHERE claimed_by = ? AND claimed_until > ? ORDER BY id', (owner, now)
+            ).fetchall()
+        return [(op_id, op, bet_id, json.loads(payload)) for op_id, op, bet_id, payload in rows]
+
+    def outbox_done(self, op_ids):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in op_ids])
+
+    def outbox_release(self, op_ids, error=None, permanent=False):
+        """
+        Devolve operações à fila, registrando `error`. Só falhas com `permanent=True` (erro que
+        não se resolve sozinho) contam tentativas; a operação é descartada após MAX_ATTEMPTS delas.
+        """
+        with self._lock, self._conn:
+            if error is None:
+                self._conn.executemany(
+                    'UPDATE outbox SET claimed_by = NULL, claimed_until = NULL WHERE id = ?', [(i,) for i in op_ids]
+                )
+                return
+            self._conn.executemany('''
+                UPDATE outbox SET claimed_by = NULL, claimed_until = NULL, attempts = attempts + ?1, last_error = ?2,
+                    dead = CASE WHEN ?1 AND attempts + 1 >= ?3 THEN 1 ELSE 0 END
+                WHERE id = ?4
+            ''', [(int(permanent), str(error), self.MAX_ATTEMPTS, i) for i in op_ids])
+            dead = self._conn.execute(
+                f"SELECT id, op, bet_id FROM outbox WHERE dead = 1 AND id IN ({','.join('?' * len(op_ids))})", list(op_ids)
+            ).fetchall()
+        for op_id, op, bet_id in dead:
+            logging.critical(f"[Ledger] Operação {op_id} ('{op}', aposta {bet_id}) descartada após {self.MAX_ATTEMPTS} falhas: {error}")
+
+    def revive_dead(self):
+        """Devolve à fila as operações descartadas, com as tentativas zeradas. Retorna quantas."""
+        with self._lock, self._conn:
+            revived = self._conn.execute('UPDATE outbox SET dead = 0, attempts = 0 WHERE dead = 1').rowcount
+        if revived:
+            logging.warning(f"[Ledger] {revived} operações descartadas anteriormente voltaram para o outbox.")
+        return revived
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
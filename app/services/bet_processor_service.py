@@ -1,22 +1,68 @@
 # Arquivo: app/services/bet_processor_service.py
-# Versão: Final - Fluxo simplificado com chamada única de IA.
+# Versão: 2.4 - Competição indicada pela IA (nome e país, ou citada no texto) repassada para a busca da partida.
 
+import asyncio
 import logging
 from telethon.tl.custom import Message
 from app.services.ai_service import AIService
 from app.services.api_football_service import ApiFootballService
+from app.services.dedup_service import NearDuplicateDetector
+from app.services.preclassifier_service import MessagePreClassifier
 
 class BetProcessorService:
-    def __init__(self, ai: AIService, api_football: ApiFootballService):
+    def __init__(self, ai: AIService, api_football: ApiFootballService, dedup: NearDuplicateDetector = None,
+                 preclassifier: MessagePreClassifier = None):
         self.ai = ai
         self.api_football = api_football
+        self.dedup = dedup
+        self.preclassifier = preclassifier
 
-    async def process_message(self, message: Message, channel_name: str):
-        logging.info(f"Iniciando processamento para msg ID {message.id} do canal '{channel_name}'")
-        image_bytes = await message.download_media(file=bytes) if message.photo else None
+    async def _collect_content(self, messages):
+        """Baixa as fotos em paralelo e usa a primeira legenda não vazia como texto."""
+        photos = [m for m in messages if m.photo]
+        images = await asyncio.gather(*(m.download_media(file=bytes) for m in photos))
+        images = [img for img in images if img]
+        text = next((m.text for m in messages if m.text), None)
+        return text, images
+
+    async def process_message(self, message: Message, channel_name: str, album: list = None):
+        """Processa uma mensagem avulsa ou, se `album` for informado, todas as partes do álbum em uma única análise."""
+        messages = album or [message]
+        if album:
+            logging.info(f"Iniciando processamento do álbum de {len(album)} partes (msg ID {message.id}) do canal '{channel_name}'")
+        else:
+            logging.info(f"Iniciando processamento para msg ID {message.id} do canal '{channel_name}'")
+        message_text, images = await self._collect_content(messages)
+        image_bytes = images[0] if len(images) == 1 else (images or None)
+
+        # 0. Pré-classificação local: conversa, promoções e comemorações nem chegam à IA.
+        local_decision = None
+        if self.preclassifier:
+            skip, local_decision = self.preclassifier.should_skip(message_text, bool(images))
+            if skip:
+                logging.info(f"Msg {message.id} descartada pelo pré-classificador local. Ignorando.")
+                return None, "Ignored"
+
+        # Repost de uma mensagem já vista na janela de tempo? Reaproveita a análise original.
+        dedup_entry = None
+        if self.dedup:
+            original, dedup_entry = self.dedup.claim(message_text, images[0] if images else None, source=f"'{channel_name}' msg {message.id}")
+            if original:
+                original_result = await self.dedup.wait_result(original)
+                if original_result is not None:
+                    logging.info(f"Msg {message.id} é um repost de {original.source}. Análise de IA reaproveitada (economizadas: {self.dedup.stats['ai_calls_saved']}).")
+                    return original_result, "Duplicate"
 
         # 1. Análise e Validação em Uma Etapa
-        analysis_result = await self.ai.analyze_and_validate(message.text, image_bytes, channel_name)
+        analysis_result = None
+        try:
+            analysis_result = await self.ai.analyze_and_validate(message_text, image_bytes, channel_name)
+        finally:
+            if dedup_entry is not None:
+                usable = analysis_result is not None and analysis_result.get('message_type') != 'erro_ia'
+                self.dedup.resolve(dedup_entry, analysis_result if usable else None)
+        if self.preclassifier:
+            self.preclassifier.record_ai_verdict(local_decision, analysis_result.get('message_type'))
         
         if analysis_result.get('message_type') != 'nova_aposta':
             logging.warning(f"Msg {message.id} classificada como '{analysis_result.get('message_type')}'. Ignorando.")
@@ -31,19 +77,27 @@ class BetProcessorService:
 
         if jogos_text and data_evento:
             logging.info(f"Buscando IDs para a partida validada: '{jogos_text}'")
-            fixture, reason = await self.api_football.find_match_by_name(jogos_text, data_evento)
+            fixture, reason = await self.api_football.find_match_by_name(
+                jogos_text, data_evento,
+                competition=entry.get('campeonato') or None,
+                competition_country=entry.get('pais_campeonato') or None,
+                message_text=message_text or None,
+            )
             
             if reason == "Success" and fixture:
                 bet_data['home_team_id'] = fixture['teams']['home']['id']
                 bet_data['away_team_id'] = fixture['teams']['away']['id']
-                logging.info(f"IDs da API-Football encontrados: {bet_data['home_team_id']}, {bet_data['away_team_id']}")
+                bet_data['fixture_id'] = fixture['fixture']['id']
+                logging.info(f"IDs da API-Football encontrados: {bet_data['home_team_id']}, {bet_data['away_team_id']} (partida {bet_data['fixture_id']})")
             else:
                 bet_data['home_team_id'] = "NAO_ENCONTRADO"
                 bet_data['away_team_id'] = "NAO_ENCONTRADO"
+                bet_data['fixture_id'] = "NAO_ENCONTRADO"
                 logging.warning(f"Partida validada pela IA não encontrada na API-Football. Razão: {reason}")
         else:
             bet_data['home_team_id'] = ''
             bet_data['away_team_id'] = ''
+            bet_data['fixture_id'] = ''
             logging.warning(f"Dados de 'jogos' ou 'data_evento_completa' ausentes após análise da IA para msg {message.id}.")
         
         return analysis_result, "Success"
\ No newline at end of file
@@ -0,0 +1,126 @@
+# Arquivo: app/services/cache_service.py
+# Descrição: Cache em dois níveis (LRU em memória + SQLite em disco) com TTL e limite de tamanho.
+
+import sqlite3
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+def make_key(*parts):
+    """Gera uma chave estável (sha256) a partir de partes arbitrárias."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            digest.update(part)
+        else:
+            digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+class TieredCache:
+    """
+    Valores são serializados em JSON; cada `get` devolve uma cópia nova,
+    então quem chama pode alterar o resultado sem contaminar o cache.
+    """
+    def __init__(self, db_path, table, ttl_seconds=None, max_entries=50000, memory_size=1000, keep_stale_seconds=0):
+        self.db_path = db_path
+        # Entradas vencidas continuam no disco por este tempo (para revalidação ou uso offline).
+        self.keep_stale_seconds = keep_stale_seconds
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_size = memory_size
+        self._memory = OrderedDict()   # key -> (expires_at, json_str)
+        self._lock = threading.RLock()
+        self._writes_since_evict = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL
+                )
+            ''')
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_created ON {self.table} (created_at)')
+
+    def _remember(self, key, expires_at, raw):
+        self._memory[key] = (expires_at, raw)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Retorna o valor armazenado ou None (ausente ou expirado)."""
+        value, fresh = self.get_with_staleness(key)
+        return value if fresh else None
+
+    def get_with_staleness(self, key):
+        """Retorna (valor, ainda_válido). Entradas vencidas são devolvidas com `False`; ausentes, (None, False)."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and (cached[0] is None or cached[0] > now):
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return json.loads(cached[1]), True
+
+            row = self._conn.execute(
+                f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row and (row[1] is None or row[1] > now):
+                self._remember(key, row[1], row[0])
+                self.stats['disk_hits'] += 1
+                return json.loads(row[0]), True
+
+            self.stats['misses'] += 1
+            return (json.loads(row[0]), False) if row else (None, False)
+
+    def set(self, key, value, ttl_seconds=None):
+        """Armazena `value`; `ttl_seconds=0` significa permanente, None usa o TTL padrão."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, expires_at, raw)
+            with self._conn:
+                self._conn.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                    (key, raw, now, expires_at)
+                )
+            self.stats['writes'] += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self.evict()
+
+    def evict(self):
+        """Remove entradas expiradas e, se necessário, as mais antigas até caber em `max_entries`."""
+        with self._lock, self._conn:
+            self._writes_since_evict = 0
+            self._conn.execute(
+                f'DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                (time.time() - self.keep_stale_seconds,)
+            )
+            if self.max_entries:
+                self._conn.execute(f'''
+                    DELETE FROM {self.table} WHERE key IN (
+                        SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._memory.clear()
+            self._conn.execute(f'DELETE FROM {self.table}')
+        logging.info(f"[Cache] Tabela '{self.table}' limpa.")
@@ -1,24 +1,72 @@
 # Arquivo: app/services/db_service.py
 # Descrição: Gerencia a conexão e as operações com o banco de dados SQLite.
+# Versão: 2.0 - Conexão persistente em modo WAL, filtro em memória, inserções em lote e retenção.
 
 import sqlite3
 import os
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 from app.config import Config
 
+class BloomFilter:
+    """Filtro de Bloom simples: `False` significa 'com certeza nunca visto'."""
+    def __init__(self, capacity=1_000_000, hashes=7):
+        self.size = max(8, capacity * 10)  # ~1% de falsos positivos com 7 hashes
+        self.hashes = hashes
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
 class DbService:
     def __init__(self, cfg: Config):
         self.db_path = cfg.DB_PATH
+        self.retention_days = cfg.DB_RETENTION_DAYS
+        self.batch_size = cfg.DB_BATCH_SIZE
+        self.flush_interval = cfg.DB_FLUSH_INTERVAL_SECONDS
+        self.cache_size = cfg.DB_CACHE_SIZE
+
+        self._conn = None
+        self._lock = threading.RLock()
+        self._recent = OrderedDict()   # LRU de chaves já processadas
+        self._bloom = BloomFilter(cfg.DB_BLOOM_CAPACITY)
+        self._pending = []             # inserções aguardando o próximo flush
+        self._pending_keys = set()
+        self._watermarks = {}          # channel_id -> maior message_id processado (pendente de flush)
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _key(channel_id, message_id):
+        return f"{channel_id}:{message_id}"
 
     def _get_connection(self):
-        """Cria e retorna uma conexão com o banco de dados."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        return conn
+        """Retorna a conexão persistente, criando-a na primeira chamada."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # check_same_thread=False: o acesso é serializado por self._lock.
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=64)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        return self._conn
 
     def setup_database(self):
         """Cria a tabela de mensagens processadas se ela não existir."""
         conn = self._get_connection()
-        with conn:
+        with self._lock, conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS processed_messages (
                     message_id INTEGER NOT NULL,
@@ -27,26 +75,137 @@ class DbService:
                     PRIMARY KEY (channel_id, message_id)
                 )
             ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_messages (processed_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS channel_watermarks (
+                    channel_id INTEGER PRIMARY KEY,
+                    last_message_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Bancos anteriores às marcas d'água: semeia cada canal com o maior ID já processado,
+            # para que a atualização nem pule o backfill nem reprocesse o canal desde o início.
+            conn.execute('''
+                INSERT OR IGNORE INTO channel_watermarks (channel_id, last_message_id)
+                SELECT channel_id, MAX(message_id) FROM processed_messages GROUP BY channel_id
+            ''')
+        self.purge_old_messages()
+        self._warm_filter()
         print("Banco de dados configurado com sucesso.")
 
-    def add_processed_message(self, channel_id, message_id):
-        """Adiciona o ID de uma mensagem ao banco de dados para marcar como processada."""
+    def _warm_filter(self):
+        """Carrega as chaves existentes no filtro de Bloom para evitar leituras de disco em mensagens novas."""
         conn = self._get_connection()
-        with conn:
-            try:
-                conn.execute(
-                    'INSERT INTO processed_messages (channel_id, message_id) VALUES (?, ?)',
-                    (channel_id, message_id)
+        with self._lock:
+            for channel_id, message_id in conn.execute('SELECT channel_id, message_id FROM processed_messages'):
+                self._bloom.add(self._key(channel_id, message_id))
+
+    def _remember(self, key):
+        self._bloom.add(key)
+        self._recent[key] = True
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+
+    def add_processed_message(self, channel_id, message_id):
+        """Marca a mensagem como processada. A gravação em disco é feita em lote."""
+        key = self._key(channel_id, message_id)
+        with self._lock:
+            self._remember(key)
+            if key not in self._pending_keys:
+                self._pending_keys.add(key)
+                self._pending.append((channel_id, message_id))
+            if message_id > self._watermarks.get(channel_id, 0):
+                self._watermarks[channel_id] = message_id
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """Grava no SQLite todas as marcações pendentes em uma única transação."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._watermarks: return
+            conn = self._get_connection()
+            with conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO processed_messages (channel_id, message_id) VALUES (?, ?)',
+                    self._pending
                 )
-            except sqlite3.IntegrityError:
-                pass # A mensagem já existe, o que é esperado em alguns casos.
+                self._write_watermarks(conn, self._watermarks.items())
+            self._pending = []
+            self._pending_keys = set()
+            self._watermarks = {}
 
-    def is_message_processed(self, channel_id, message_id):
-        """Verifica no banco de dados se uma mensagem já foi processada."""
+    @staticmethod
+    def _write_watermarks(conn, items):
+        # Só avança a marca; nunca regride para um ID menor.
+        conn.executemany('''
+            INSERT INTO channel_watermarks (channel_id, last_message_id) VALUES (?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                last_message_id = MAX(last_message_id, excluded.last_message_id),
+                updated_at = CURRENT_TIMESTAMP
+        ''', list(items))
+
+    def get_last_message_id(self, channel_id):
+        """Retorna o maior ID de mensagem já processado no canal, ou None se o canal é novo."""
+        with self._lock:
+            row = self._get_connection().execute(
+                'SELECT last_message_id FROM channel_watermarks WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+            stored = row[0] if row else None
+            pending = self._watermarks.get(channel_id)
+            if pending is None: return stored
+            return max(pending, stored or 0)
+
+    def set_last_message_id(self, channel_id, message_id):
+        """Avança a marca do canal para `message_id` (ponto de partida de canais novos ou readicionados)."""
         conn = self._get_connection()
-        with conn:
-            cursor = conn.execute(
+        with self._lock, conn:
+            self._write_watermarks(conn, [(channel_id, message_id)])
+
+    def is_message_processed(self, channel_id, message_id):
+        """Verifica se uma mensagem já foi processada, consultando o disco só quando necessário."""
+        key = self._key(channel_id, message_id)
+        with self._lock:
+            if key in self._recent or key in self._pending_keys:
+                return True
+            if key not in self._bloom:
+                return False
+            cursor = self._get_connection().execute(
                 'SELECT 1 FROM processed_messages WHERE channel_id = ? AND message_id = ?',
                 (channel_id, message_id)
             )
-            return cursor.fetchone() is not None
+            found = cursor.fetchone() is not None
+            if found:
+                self._remember(key)
+            return found
+
+    def purge_old_messages(self):
+        """Remove registros mais antigos que a janela de retenção configurada."""
+        if not self.retention_days or self.retention_days <= 0: return 0
+        conn = self._get_connection()
+        with self._lock, conn:
+            deleted = conn.execute(
+                "DELETE FROM processed_messages WHERE processed_at < datetime('now', ?)",
+                (f'-{int(self.retention_days)} days',)
+            ).rowcount
+        if deleted:
+            logging.info(f"[DB] {deleted} registros de mensagens antigas removidos (retenção: {self.retention_days} dias).")
+        return deleted
+
+    async def maintenance_task(self):
+        """Faz flush periódico das marcações pendentes e aplica a retenção uma vez por dia."""
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+            if time.monotonic() - last_purge >= 86400:
+                self.purge_old_messages()
+                last_purge = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,186 @@
+# Arquivo: app/services/dedup_service.py
+# Descrição: Detecta reposts quase idênticos (entre canais e espelhos "chat") antes da chamada de IA.
+
+import asyncio
+import hashlib
+import io
+import logging
+import re
+import time
+import unicodedata
+from collections import deque
+from PIL import Image
+
+def normalize_text(text):
+    """Minúsculas, sem acentos, links, emojis e pontuação; espaços colapsados."""
+    if not text: return ""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'https?://\S+|t\.me/\S+|@[a-z_]\w*', ' ', text)  # links e menções (não odds como @1.85)
+    text = re.sub(r'(?<=\d)[.,](?=\d)', '.', text)  # preserva odds e linhas (1,85 -> 1.85)
+    text = re.sub(r'[^a-z0-9.+ ]+|(?<!\d)\.|\.(?!\d)', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def text_simhash(normalized_text):
+    """SimHash de 64 bits sobre palavras e pares de palavras."""
+    words = normalized_text.split()
+    shingles = words + [' '.join(words[i:i + 2]) for i in range(len(words) - 1)]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def image_dhash(image_bytes, size=8):
+    """Hash perceptual (dHash) de 64 bits; robusto a recompressão e redimensionamento."""
+    try:
+        img = Image.open(io.BytesIO(image_bytes)).convert('L').resize((size + 1, size), Image.LANCZOS)
+    except Exception as e:
+        logging.warning(f"[Dedup] Não foi possível calcular o hash da imagem: {e}")
+        return None
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left, right = pixels[row * (size + 1) + col], pixels[row * (size + 1) + col + 1]
+            value = value << 1 | (left > right)
+    return value
+
+class HammingIndex:
+    """
+    Índice de hashes de 64 bits por bandas: dois hashes a distância <= bands-1
+    compartilham ao menos uma banda idêntica, então só esses candidatos são comparados.
+    """
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = -(-64 // self.bands)
+        self._buckets = {}
+
+    def _keys(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(i, value >> (i * self.band_bits) & mask) for i in range(self.bands)]
+
+    def add(self, value, entry):
+        for key in self._keys(value):
+            self._buckets.setdefault(key, set()).add(entry)
+
+    def remove(self, value, entry):
+        for key in self._keys(value):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(entry)
+                if not bucket: del self._buckets[key]
+
+    def candidates(self, value):
+        found = set()
+        for key in self._keys(value):
+            found |= self._buckets.get(key, set())
+        return found
+
+    def near(self, a, b):
+        return (a ^ b).bit_count() <= self.max_distance
+
+def media_digest(image_bytes):
+    """SHA-256 do arquivo: reposts encaminhados trazem exatamente os mesmos bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+class _Entry:
+    __slots__ = ('created_at', 'text_hash', 'image_hash', 'media_digest', 'source', 'future')
+
+    def __init__(self, text_hash, image_hash, digest, source):
+        self.created_at = time.monotonic()
+        self.text_hash = text_hash
+        self.image_hash = image_hash
+        self.media_digest = digest
+        self.source = source
+        self.future = asyncio.get_running_loop().create_future()
+
+class NearDuplicateDetector:
+    MIN_TEXT_LENGTH = 25  # textos curtos ("green", "bora") não são comparados sozinhos
+
+    def __init__(self, window_minutes=30, text_distance=3, image_distance=6):
+        self.window_seconds = window_minutes * 60
+        self._text_index = HammingIndex(text_distance)
+        self._image_index = HammingIndex(image_distance)
+        self._by_digest = {}   # sha256 da mídia -> entrada mais recente
+        self._entries = deque()
+        self.stats = {'checked': 0, 'duplicates': 0, 'ai_calls_saved': 0}
+
+    def _expire(self):
+        limit = time.monotonic() - self.window_seconds
+        while self._entries and self._entries[0].created_at < limit:
+            entry = self._entries.popleft()
+            if entry.text_hash is not None: self._text_index.remove(entry.text_hash, entry)
+            if entry.image_hash is not None: self._image_index.remove(entry.image_hash, entry)
+            if entry.media_digest is not None and self._by_digest.get(entry.media_digest) is entry:
+                del self._by_digest[entry.media_digest]
+
+    def _fingerprint(self, message_text, image_bytes):
+        normalized = normalize_text(message_text)
+        text_hash = text_simhash(normalized) if len(normalized) >= self.MIN_TEXT_LENGTH else None
+        image_hash = image_dhash(image_bytes) if image_bytes else None
+        digest = media_digest(image_bytes) if image_bytes else None
+        return text_hash, image_hash, digest
+
+    def _texts_agree(self, a, b):
+        return a is None or b is None or self._text_index.near(a, b)
+
+    def _find(self, text_hash, image_hash, digest):
+        if digest is not None:
+            # Mesmo arquivo: só diverge se ambos os textos forem relevantes e diferentes.
+            entry = self._by_digest.get(digest)
+            if entry is not None and self._texts_agree(text_hash, entry.text_hash):
+                return entry
+        if image_hash is not None:
+            # O dHash não distingue bilhetes diferentes feitos no mesmo modelo da casa de apostas:
+            # imagem parecida só conta como repost se os textos também baterem.
+            if text_hash is None: return None
+            for entry in self._image_index.candidates(image_hash):
+                if entry.text_hash is None or not self._image_index.near(image_hash, entry.image_hash): continue
+                if self._text_index.near(text_hash, entry.text_hash):
+                    return entry
+            return None
+        if text_hash is not None:
+            for entry in self._text_index.candidates(text_hash):
+                if entry.image_hash is None and self._text_index.near(text_hash, entry.text_hash):
+                    return entry
+        return None
+
+    def claim(self, message_text, image_bytes, source):
+        """
+        Procura um post equivalente na janela de tempo.
+        Retorna (entrada_existente, None) em caso de duplicata, ou (None, nova_entrada)
+        que deve ser resolvida com `resolve` após a análise.
+        """
+        self._expire()
+        self.stats['checked'] += 1
+        text_hash, image_hash, digest = self._fingerprint(message_text, image_bytes)
+        if text_hash is None and image_hash is None and digest is None:
+            return None, None
+
+        existing = self._find(text_hash, image_hash, digest)
+        if existing:
+            self.stats['duplicates'] += 1
+            return existing, None
+
+        entry = _Entry(text_hash, image_hash, digest, source)
+        self._entries.append(entry)
+        if text_hash is not None: self._text_index.add(text_hash, entry)
+        if image_hash is not None: self._image_index.add(image_hash, entry)
+        if digest is not None: self._by_digest[digest] = entry
+        return None, entry
+
+    @staticmethod
+    def resolve(entry, analysis_result):
+        """Publica o resultado da análise original para os reposts que estão aguardando."""
+        if entry is not None and not entry.future.done():
+            entry.future.set_result(analysis_result)
+
+    async def wait_result(self, entry):
+        """Aguarda a análise do post original. Retorna None se ela falhou."""
+        result = await asyncio.shield(entry.future)
+        if result is not None:
+            self.stats['ai_calls_saved'] += 1
+        return result
@@ -0,0 +1,82 @@
+# Arquivo: app/services/fixtures_cache.py
+# Descrição: Cache de partidas por data, compartilhado pela ingestão e pela verificação de resultados.
+
+import asyncio
+import logging
+import time
+
+FINISHED_STATUSES = {'FT', 'AET', 'PEN', 'AWD', 'WO'}
+LIVE_STATUSES = {'1H', 'HT', '2H', 'ET', 'BT', 'P', 'SUSP', 'INT', 'LIVE'}
+# Adiadas, canceladas ou abandonadas ainda podem ser remarcadas (e ganhar um resultado).
+POSTPONED_STATUSES = {'PST', 'CANC', 'ABD'}
+
+def fixtures_ttl(fixtures, cfg):
+    """Validade (segundos) de uma lista de partidas; None = permanente (todas encerradas)."""
+    statuses = {f.get('fixture', {}).get('status', {}).get('short') for f in fixtures}
+    if statuses and statuses <= FINISHED_STATUSES:
+        return None
+    if statuses & LIVE_STATUSES:
+        return cfg.FIXTURES_LIVE_TTL_SECONDS
+    if statuses and statuses <= FINISHED_STATUSES | POSTPONED_STATUSES:
+        return cfg.FIXTURES_POSTPONED_TTL_SECONDS
+    return cfg.FIXTURES_PENDING_TTL_SECONDS
+
+class FixturesDay:
+    """Todas as partidas de um dia, indexadas por (mandante, visitante)."""
+    def __init__(self, fixtures, expires_at):
+        self.expires_at = expires_at
+        self.by_pair = {
+            (fixture['teams']['home']['id'], fixture['teams']['away']['id']): fixture for fixture in fixtures
+        }
+
+    @property
+    def fresh(self):
+        return self.expires_at is None or self.expires_at > time.monotonic()
+
+class FixturesCache:
+    """
+    Busca a lista de partidas de um dia uma única vez (`/fixtures?date=`) e responde
+    localmente às consultas por IDs. A validade depende do status das partidas:
+    dia todo encerrado fica em cache para sempre; com jogos ao vivo, poucos minutos.
+    """
+    def __init__(self, http, cfg):
+        self.http = http
+        self.config = cfg
+        self._days = {}
+        self._inflight = {}
+        self.stats = {'hits': 0, 'fetches': 0}
+
+    def _expires_at(self, fixtures):
+        ttl = fixtures_ttl(fixtures, self.config)
+        return None if ttl is None else time.monotonic() + ttl
+
+    async def _fetch_day(self, date_str):
+        self.stats['fetches'] += 1
+        data = await self.http.aget('fixtures', {'date': date_str})
+        if data is None:
+            return None
+        fixtures = data.get('response', [])
+        day = FixturesDay(fixtures, self._expires_at(fixtures))
+        self._days[date_str] = day
+        logging.info(f"[Fixtures] {len(fixtures)} partidas de {date_str} carregadas no cache.")
+        return day
+
+    async def get_day(self, date_str):
+        """Retorna o FixturesDay de `date_str` (AAAA-MM-DD), buscando na API só quando expirado."""
+        day = self._days.get(date_str)
+        if day and day.fresh:
+            self.stats['hits'] += 1
+            return day
+
+        inflight = self._inflight.get(date_str)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._fetch_day(date_str))
+            self._inflight[date_str] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(date_str, None))
+        fetched = await asyncio.shield(inflight)
+        # Em caso de falha na API, uma cópia vencida ainda é melhor do que nada.
+        return fetched or day
+
+    async def find(self, date_str, home_id, away_id):
+        day = await self.get_day(date_str)
+        return day.by_pair.get((home_id, away_id)) if day else None
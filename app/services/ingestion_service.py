@@ -0,0 +1,198 @@
+# Arquivo: app/services/ingestion_service.py
+# Descrição: Fila de ingestão limitada, com prioridades, ordem por canal e contadores; agregação de álbuns.
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+class IngestionQueue:
+    """
+    Fila assíncrona limitada drenada por um pool de workers.
+
+    - Mensagens de um mesmo canal são processadas em ordem e nunca em paralelo.
+    - Canais diferentes são processados em paralelo, respeitando a prioridade
+      da mensagem que está na frente de cada canal (menor = mais urgente).
+    - Quando a fila está cheia, `put` aguarda (backpressure) em vez de descartar.
+    """
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+
+    def __init__(self, handler, workers=4, maxsize=200, name="Ingestão"):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.maxsize = max(1, int(maxsize))
+        self.name = name
+
+        self._channels = {}          # channel_id -> deque[(priority, enqueued_at, item)]
+        self._ready = []             # heap de (priority, seq, channel_id)
+        self._busy = set()           # canais com um item em processamento
+        self._seq = itertools.count()
+        self._size = 0
+        self._cond = asyncio.Condition()
+        self._tasks = []
+
+        self.stats = {
+            'enqueued': 0, 'processed': 0, 'failed': 0,
+            'max_depth': 0, 'backpressure_waits': 0,
+            'total_wait_s': 0.0, 'max_wait_s': 0.0,
+        }
+
+    @property
+    def depth(self):
+        return self._size
+
+    def _schedule(self, channel_id):
+        """Coloca o canal na fila de prontos, se tiver itens e não estiver ocupado."""
+        pending = self._channels.get(channel_id)
+        if pending and channel_id not in self._busy:
+            heapq.heappush(self._ready, (pending[0][0], next(self._seq), channel_id))
+
+    async def put(self, channel_id, item, priority=PRIORITY_NORMAL):
+        async with self._cond:
+            if self._size >= self.maxsize:
+                self.stats['backpressure_waits'] += 1
+                logging.warning(f"[{self.name}] Fila cheia ({self._size}/{self.maxsize}). Aguardando espaço...")
+                await self._cond.wait_for(lambda: self._size < self.maxsize)
+
+            pending = self._channels.setdefault(channel_id, deque())
+            was_empty = not pending
+            pending.append((priority, time.monotonic(), item))
+            self._size += 1
+            self.stats['enqueued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self._size)
+            if was_empty:
+                self._schedule(channel_id)
+            self._cond.notify_all()
+
+    async def _next(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: bool(self._ready))
+            _, _, channel_id = heapq.heappop(self._ready)
+            _, enqueued_at, item = self._channels[channel_id].popleft()
+            self._busy.add(channel_id)
+            self._size -= 1
+            self._cond.notify_all()
+            return channel_id, enqueued_at, item
+
+    async def _release(self, channel_id):
+        async with self._cond:
+            self._busy.discard(channel_id)
+            if not self._channels.get(channel_id):
+                self._channels.pop(channel_id, None)
+            else:
+                self._schedule(channel_id)
+            self._cond.notify_all()
+
+    async def _worker(self, worker_id):
+        while True:
+            channel_id, enqueued_at, item = await self._next()
+            waited = time.monotonic() - enqueued_at
+            self.stats['total_wait_s'] += waited
+            self.stats['max_wait_s'] = max(self.stats['max_wait_s'], waited)
+            try:
+                await self.handler(item)
+                self.stats['processed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"[{self.name}] Worker {worker_id}: erro ao processar item do canal {channel_id}: {e}")
+            finally:
+                await self._release(channel_id)
+
+    def start(self):
+        if self._tasks: return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logging.info(f"[{self.name}] {self.workers} workers iniciados (capacidade da fila: {self.maxsize}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self):
+        """Retorna uma cópia dos contadores, incluindo profundidade atual e espera média."""
+        done = self.stats['processed'] + self.stats['failed']
+        return {
+            **self.stats,
+            'depth': self._size,
+            'avg_wait_s': self.stats['total_wait_s'] / done if done else 0.0,
+        }
+
+    async def log_stats_periodically(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            s = self.snapshot()
+            logging.info(
+                f"[{self.name}] Profundidade: {s['depth']} (máx {s['max_depth']}) | "
+                f"Processadas: {s['processed']} | Falhas: {s['failed']} | "
+                f"Espera média: {s['avg_wait_s']:.2f}s (máx {s['max_wait_s']:.2f}s) | "
+                f"Backpressure: {s['backpressure_waits']}"
+            )
+
+class AlbumAggregator:
+    """
+    Agrupa mensagens de um mesmo álbum do Telegram (mesmo `grouped_id`).
+    O álbum é entregue ao `on_post` como uma lista ordenada por ID assim que
+    nenhuma nova parte chega por `window` segundos. Enquanto isso, as mensagens
+    seguintes do mesmo canal esperam atrás dele: a ordem por canal é preservada
+    e a marca d'água (maior ID processado) não passa de um álbum ainda não entregue.
+    """
+    def __init__(self, on_post, window=1.5):
+        self.on_post = on_post
+        self.window = window
+        self._channels = {}   # chat_id -> deque de posts {'grouped_id', 'messages', 'last_seen', 'open'}
+        self._tasks = set()
+        self.stats = {'albums': 0, 'parts': 0, 'held': 0}
+
+    async def add(self, message):
+        chat_id = message.chat_id
+        pending = self._channels.get(chat_id)
+        if pending is None and not message.grouped_id:
+            await self.on_post([message])
+            return
+
+        if pending is None:
+            pending = self._channels[chat_id] = deque()
+            task = asyncio.create_task(self._drain(chat_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif not message.grouped_id:
+            self.stats['held'] += 1
+
+        now = time.monotonic()
+        album = next((p for p in pending if p['open'] and p['grouped_id'] == message.grouped_id), None) \
+            if message.grouped_id else None
+        if album is None:
+            pending.append({'grouped_id': message.grouped_id, 'messages': [message], 'last_seen': now,
+                            'open': bool(message.grouped_id)})
+        else:
+            album['messages'].append(message)
+            album['last_seen'] = now
+
+    async def _drain(self, chat_id):
+        """Entrega os posts do canal em ordem; cada álbum só depois de `window` segundos sem novas partes."""
+        pending = self._channels[chat_id]
+        while pending:
+            post = pending[0]
+            while post['open']:
+                remaining = post['last_seen'] + self.window - time.monotonic()
+                if remaining <= 0:
+                    post['open'] = False
+                else:
+                    await asyncio.sleep(remaining)
+            messages = sorted(post['messages'], key=lambda m: m.id)
+            if post['grouped_id']:
+                self.stats['albums'] += 1
+                self.stats['parts'] += len(messages)
+            try:
+                await self.on_post(messages)
+            except Exception as e:
+                logging.error(f"[Álbum] Erro ao entregar post {messages[0].id} do canal {chat_id}: {e}")
+            # Só sai da fila depois de entregue: o que chegar nesse meio-tempo continua atrás dele.
+            pending.popleft()
+        del self._channels[chat_id]
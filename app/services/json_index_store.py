@@ -0,0 +1,91 @@
+# Arquivo: app/services/json_index_store.py
+# Descrição: Base dos índices em SQLite construídos a partir dos mapas JSON (times, ligas).
+
+import sqlite3
+import os
+import json
+import logging
+import threading
+
+class JsonIndexStore:
+    """
+    O JSON é a fonte de distribuição; o SQLite é o formato de consulta. O banco só é
+    aberto no primeiro acesso e o JSON só é lido quando mudou desde a última importação,
+    então os processos não precisam carregar o mapa inteiro em memória. O modo WAL
+    permite que vários processos leiam (e gravem) o mesmo arquivo ao mesmo tempo.
+    """
+    LABEL = "Índice"
+
+    def __init__(self, db_path, json_path=None):
+        self.db_path = db_path
+        self.json_path = json_path
+        self._lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._create_schema(conn)
+        self._sync_json(conn)
+        return conn
+
+    def _create_schema(self, conn):
+        raise NotImplementedError
+
+    def _import_rows(self, conn, data):
+        """Grava o conteúdo do JSON no banco; retorna o número de entradas lidas."""
+        raise NotImplementedError
+
+    def _json_mtime(self):
+        try:
+            return os.path.getmtime(self.json_path)
+        except (TypeError, OSError):
+            return None
+
+    def _sync_json(self, conn):
+        mtime = self._json_mtime()
+        if mtime is None: return
+        row = conn.execute("SELECT value FROM store_meta WHERE key = 'json_mtime'").fetchone()
+        if row and float(row[0]) >= mtime: return
+        self.import_json(self.json_path, conn)
+
+    def _mark_synced(self, conn):
+        mtime = self._json_mtime()
+        if mtime is None: return
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_mtime', ?)", (str(mtime),))
+
+    def import_json(self, json_path, conn=None):
+        """(Re)constrói o índice a partir do JSON."""
+        conn = conn or self.conn
+        if not os.path.exists(json_path): return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            logging.error(f"[{self.LABEL}] '{json_path}' mal formatado. Importação ignorada.")
+            return 0
+        with self._lock, conn:
+            imported = self._import_rows(conn, data)
+        if json_path == self.json_path:
+            self._mark_synced(conn)
+        logging.info(f"[{self.LABEL}] {imported} nomes importados de '{os.path.basename(json_path)}'.")
+        return imported
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
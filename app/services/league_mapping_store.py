@@ -0,0 +1,82 @@
+# Arquivo: app/services/league_mapping_store.py
+# Descrição: Índice (nome, país) -> liga (ID e nome oficial) construído a partir do league_mappings.json.
+
+from app.services.json_index_store import JsonIndexStore
+
+class LeagueMappingStore(JsonIndexStore):
+    """
+    Somente leitura em tempo de execução; o JSON é gerado pelo build_league_map. O mesmo nome
+    existe em vários países ("Premier League", "Serie A", "Cup"), então a chave é nome + país.
+    Entradas sem país (JSON gerado por versões antigas, chaveado só pelo nome) nunca adivinham
+    a liga: ficam inertes até `assign_countries` completar o país a partir do ID.
+    """
+    LABEL = "Ligas"
+
+    def _create_schema(self, conn):
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(league_mappings)')}
+        if columns and 'country' not in columns:
+            # Tabela da versão anterior (chave só pelo nome): recriada e reimportada do JSON.
+            conn.execute('DROP TABLE league_mappings')
+            conn.execute("DELETE FROM store_meta WHERE key = 'json_mtime'")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS league_mappings (
+                name TEXT NOT NULL,
+                country TEXT NOT NULL DEFAULT '',
+                league_id INTEGER NOT NULL,
+                official_name TEXT NOT NULL,
+                PRIMARY KEY (name, country)
+            )
+        ''')
+
+    def _import_rows(self, conn, data):
+        rows = [
+            ((info.get('name') or key).lower(), (info.get('country') or '').lower(), info['id'], info.get('name') or key)
+            for key, info in data.items() if isinstance(info, dict) and info.get('id')
+        ]
+        conn.execute('DELETE FROM league_mappings')
+        conn.executemany(
+            'INSERT OR REPLACE INTO league_mappings (name, country, league_id, official_name) VALUES (?, ?, ?, ?)', rows
+        )
+        return len(rows)
+
+    def get(self, name, country=None):
+        """
+        Retorna (league_id, nome oficial) ou None. Com `country`, procura a liga daquele país;
+        sem ele, só responde se o nome for de uma única liga, de país conhecido.
+        """
+        if not name: return None
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT country, league_id, official_name FROM league_mappings WHERE name = ?', (name.lower().strip(),)
+            ).fetchall()
+        if country:
+            rows = [r for r in rows if r[0] == country.lower().strip()]
+        elif any(not r[0] for r in rows):
+            return None   # entrada antiga, sem país: não dá para saber se o nome é único
+        return (rows[0][1], rows[0][2]) if len(rows) == 1 else None
+
+    def names(self):
+        """Nomes distintos de ligas (base do índice aproximado)."""
+        with self._lock:
+            return [r[0] for r in self.conn.execute('SELECT DISTINCT name FROM league_mappings')]
+
+    def unambiguous_items(self):
+        """[(nome, league_id)] dos nomes que pertencem a uma única liga, de país conhecido."""
+        with self._lock:
+            return self.conn.execute('''
+                SELECT name, MIN(league_id) FROM league_mappings
+                GROUP BY name HAVING COUNT(*) = 1 AND MAX(country) != ''
+            ''').fetchall()
+
+    def legacy_ids(self):
+        """IDs das ligas ainda sem país (JSON no formato antigo)."""
+        with self._lock:
+            return {r[0] for r in self.conn.execute("SELECT DISTINCT league_id FROM league_mappings WHERE country = ''")}
+
+    def assign_countries(self, countries):
+        """Migração do formato antigo: completa o país das entradas pelo ID (`{league_id: país}`)."""
+        rows = [(country.lower(), league_id) for league_id, country in countries.items() if country]
+        with self._lock, self.conn:
+            return self.conn.executemany(
+                "UPDATE OR REPLACE league_mappings SET country = ? WHERE league_id = ? AND country = ''", rows
+            ).rowcount
@@ -0,0 +1,80 @@
+# Arquivo: app/services/preclassifier_service.py
+# Descrição: Pré-classificador local por regras, executado antes da IA para descartar mensagens que não são apostas.
+
+import logging
+import re
+
+class MessagePreClassifier:
+    BET = "aposta"
+    SKIP = "ignoravel"
+    UNSURE = "incerto"
+
+    ODDS_RE = re.compile(r'(?:@\s*|\bodds?\s*:?\s*)\d{1,2}[.,]\d{1,3}\b|\b(?:1|2|3|4|5|6|7|8|9|1\d)[.,]\d{2}\b', re.IGNORECASE)
+    TEAM_SEPARATOR_RE = re.compile(r'\S\s+(?:x|vs\.?|v)\s+\S', re.IGNORECASE)
+    STAKE_RE = re.compile(r'\b\d+(?:[.,]\d+)?\s*(?:u|un|uni|unidades?|%)(?:\s|$|\b)|\bstake\b|\bunidade', re.IGNORECASE)
+    MARKET_RE = re.compile(r'\b(?:over|under|mais de|menos de|ambas marcam|btts|handicap|escanteios|cart[õo]es|finaliza[çc][õo]es|dupla chance|empate anula|resultado final|ml)\b', re.IGNORECASE)
+    RESULT_RE = re.compile(r'\b(?:green+|red+|bateu|batido|cashout|void|anulad[ao])\b|✅|❌|💚|🟢|🔴', re.IGNORECASE)
+    BET_PHRASE_RE = re.compile(r'\b(?:entradas?|vit[óo]ria|vence(?:r|dor)?|apost[ae]|palpites?|tips?|odds?|m[úu]ltipla|dupla|tripla)\b|@', re.IGNORECASE)
+    PROMO_RE = re.compile(r'\b(?:cupom|promo[çc][ãa]o|b[ôo]nus|cadastr[eao]|link na bio|sorteio|vagas?|assinatura|vip)\b', re.IGNORECASE)
+
+    def __init__(self, cfg):
+        self.mode = cfg.PRECLASSIFIER_MODE
+        self.skip_threshold = cfg.PRECLASSIFIER_SKIP_THRESHOLD
+        casas = sorted((c for c in cfg.VALID_CASAS if c), key=len, reverse=True)
+        self.bookmaker_re = re.compile(r'\b(?:' + '|'.join(re.escape(c) for c in casas) + r')\b', re.IGNORECASE) if casas else None
+        self.stats = {'checked': 0, 'skipped': 0, 'shadow_agree': 0, 'shadow_disagree': 0}
+
+    @property
+    def enabled(self):
+        return self.mode in ('shadow', 'active')
+
+    def classify(self, message_text, has_image=False):
+        """Retorna (decisão, confiança). Imagens sempre vão para a IA, pois o texto do bilhete está nelas."""
+        text = (message_text or '').strip()
+        if has_image:
+            return self.UNSURE, 0.0
+        if not text:
+            return self.SKIP, 1.0
+
+        positives = sum([
+            2 if self.ODDS_RE.search(text) else 0,
+            1 if self.TEAM_SEPARATOR_RE.search(text) else 0,
+            1 if self.STAKE_RE.search(text) else 0,
+            1 if self.MARKET_RE.search(text) else 0,
+            1 if self.BET_PHRASE_RE.search(text) else 0,
+            1 if self.bookmaker_re and self.bookmaker_re.search(text) else 0,
+        ])
+        negatives = bool(self.RESULT_RE.search(text)) + bool(self.PROMO_RE.search(text))
+
+        if positives >= 3:
+            return self.BET, min(1.0, 0.6 + 0.1 * positives)
+        if positives == 0:
+            # Só a ausência de indícios não basta para pular a IA: é preciso um sinal de resultado ou de promoção.
+            return self.SKIP, min(1.0, 0.8 + 0.1 * negatives) if negatives else 0.6
+        if positives == 1 and negatives:
+            return self.SKIP, 0.7
+        return self.UNSURE, 0.5
+
+    def should_skip(self, message_text, has_image=False):
+        """Decide se a chamada de IA pode ser evitada. Em modo 'shadow' nunca pula, só registra a decisão."""
+        if not self.enabled:
+            return False, None
+        self.stats['checked'] += 1
+        decision, confidence = self.classify(message_text, has_image)
+        skip = decision == self.SKIP and confidence >= self.skip_threshold
+        if skip and self.mode == 'active':
+            self.stats['skipped'] += 1
+            return True, decision
+        return False, decision
+
+    def record_ai_verdict(self, decision, ai_message_type):
+        """No modo 'shadow', compara a decisão local com a classificação da IA."""
+        if self.mode != 'shadow' or decision in (None, self.UNSURE):
+            return
+        agrees = (decision == self.BET) == (ai_message_type == 'nova_aposta')
+        self.stats['shadow_agree' if agrees else 'shadow_disagree'] += 1
+        if not agrees:
+            logging.info(f"[Pré-classificador] Divergência: local='{decision}', IA='{ai_message_type}'.")
+        total = self.stats['shadow_agree'] + self.stats['shadow_disagree']
+        if total % 50 == 0:
+            logging.info(f"[Pré-classificador] Concordância com a IA: {self.stats['shadow_agree']}/{total}.")
@@ -0,0 +1,175 @@
+# Arquivo: app/services/sheet_mirror.py
+# Descrição: Espelho local (SQLite) da aba APOSTAS, com índices por Situação e data do evento.
+
+import bisect
+import sqlite3
+import os
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+
+def parse_event_time(value, bet_id=None):
+    """
+    Data do evento como a planilha a formata ('DD/MM/AAAA HH:MM', com ou sem segundos, só a
+    data...) -> 'AAAA-MM-DD HH:MM', ordenável no SQLite. Mesma leniência do pd.to_datetime(dayfirst=True);
+    None (com aviso no log) se não for uma data, pois a aposta ficaria fora das consultas de pendentes.
+    """
+    text = str(value or '').strip()
+    if not text: return None
+    # ISO antes do pandas: com dayfirst=True ele lê '2025-03-05' como 3 de maio.
+    for fmt in ('%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d %H:%M')
+        except ValueError:
+            continue
+    parsed = pd.to_datetime(text, dayfirst=True, errors='coerce')
+    if pd.isna(parsed):
+        logging.warning(f"[Espelho] Data do evento inválida ('{text}') na aposta {bet_id or '?'}; ela não será verificada.")
+        return None
+    return parsed.strftime('%Y-%m-%d %H:%M')
+
+class SheetMirror:
+    """
+    Guarda uma cópia das linhas da planilha para que as consultas de pendentes e de
+    arquivamento sejam leituras locais indexadas. A chave é o número da linha (é por
+    ela que a planilha é atualizada e sincronizada); o Bet ID tem índice próprio.
+    Quem mantém o espelho em dia é o SheetsService: aplica aqui as próprias escritas
+    e, a cada ciclo, só as linhas que mudaram na planilha.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS apostas (
+                    row_number INTEGER PRIMARY KEY,
+                    bet_id TEXT,
+                    situacao TEXT,
+                    event_time TEXT,
+                    record TEXT NOT NULL,
+                    synced_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_apostas_bet_id ON apostas (bet_id)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_apostas_situacao ON apostas (situacao, event_time)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_apostas_event_time ON apostas (event_time)')
+
+    def _row(self, row_number, record, now):
+        situacao = str(record.get('Situação', '')).strip().lower()
+        bet_id = str(record.get('Bet ID', '')).strip() or None
+        return (row_number, bet_id, situacao, parse_event_time(record.get('Data Completa'), bet_id),
+                json.dumps(record, ensure_ascii=False), now)
+
+    def _insert(self, rows):
+        now = time.time()
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO apostas (row_number, bet_id, situacao, event_time, record, synced_at) VALUES (?, ?, ?, ?, ?, ?)',
+            [self._row(row_number, record, now) for row_number, record in rows]
+        )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM apostas').fetchone()[0]
+
+    def replace_all(self, rows):
+        """Ressincronização completa: `rows` é uma lista de (número da linha, registro)."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM apostas')
+            self._insert(rows)
+        logging.info(f"[Espelho] {len(rows)} linhas carregadas da planilha.")
+
+    def fingerprint(self):
+        """{linha: (Bet ID, Situação)} — o que é comparado com a planilha na verificação incremental."""
+        with self._lock:
+            return {
+                row_number: (bet_id or '', situacao or '')
+                for row_number, bet_id, situacao in self._conn.execute('SELECT row_number, bet_id, situacao FROM apostas')
+            }
+
+    def apply_changes(self, rows, last_row):
+        """Grava as linhas alteradas/novas e descarta as que ficaram além da última linha da planilha."""
+        with self._lock, self._conn:
+            self._insert(rows)
+            self._conn.execute('DELETE FROM apostas WHERE row_number > ?', (last_row,))
+
+    def put_rows(self, rows):
+        """Grava linhas relidas por inteiro da planilha, sem mexer nas demais."""
+        with self._lock, self._conn:
+            self._insert(rows)
+
+    def update_cells(self, updates):
+        """Aplica as mesmas atualizações enviadas à planilha ({'row', 'col_name', 'value'})."""
+        by_row = {}
+        for update in updates:
+            by_row.setdefault(update['row'], {})[update['col_name']] = update['value']
+        if not by_row: return
+        with self._lock, self._conn:
+            placeholders = ','.join('?' * len(by_row))
+            current = self._conn.execute(
+                f'SELECT row_number, record FROM apostas WHERE row_number IN ({placeholders})', list(by_row)
+            ).fetchall()
+            rows = []
+            for row_number, record_json in current:
+                record = json.loads(record_json)
+                record.update(by_row[row_number])
+                rows.append((row_number, record))
+            self._insert(rows)
+
+    def delete_rows(self, row_numbers):
+        """Remove as linhas e renumera as seguintes, como a planilha faz ao excluir linhas."""
+        deleted_set = set(row_numbers)
+        deleted = sorted(deleted_set)
+        if not deleted: return
+        with self._lock, self._conn:
+            remaining = self._conn.execute('SELECT row_number, record FROM apostas ORDER BY row_number').fetchall()
+            self._conn.execute('DELETE FROM apostas')
+            kept = [
+                # Cada linha sobe tantas posições quantas foram as excluídas acima dela.
+                (row_number - bisect.bisect_left(deleted, row_number), json.loads(record_json))
+                for row_number, record_json in remaining if row_number not in deleted_set
+            ]
+            self._insert(kept)
+
+    def _records(self, where='', params=()):
+        with self._lock:
+            rows = self._conn.execute(f'SELECT row_number, record FROM apostas {where} ORDER BY row_number', params).fetchall()
+        records = []
+        for row_number, record_json in rows:
+            record = json.loads(record_json)
+            record['row_number'] = row_number
+            records.append(record)
+        return records
+
+    def rows_for_bet_ids(self, bet_ids):
+        """{Bet ID: número da linha atual} para os IDs presentes na aba."""
+        bet_ids = [str(b) for b in bet_ids if b]
+        if not bet_ids: return {}
+        with self._lock:
+            return dict(self._conn.execute(
+                f"SELECT bet_id, row_number FROM apostas WHERE bet_id IN ({','.join('?' * len(bet_ids))})", bet_ids
+            ).fetchall())
+
+    def all_records(self):
+        return self._records()
+
+    def by_status(self, statuses):
+        statuses = [s.lower() for s in statuses]
+        return self._records(f"WHERE situacao IN ({','.join('?' * len(statuses))})", statuses)
+
+    def pending_before(self, check_time):
+        """Apostas 'pendente' com data do evento válida e anterior a `check_time` (datetime)."""
+        return self._records(
+            "WHERE situacao = 'pendente' AND event_time IS NOT NULL AND event_time <= ?",
+            (check_time.strftime('%Y-%m-%d %H:%M'),)
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
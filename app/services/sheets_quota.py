@@ -0,0 +1,115 @@
+# Arquivo: app/services/sheets_quota.py
+# Descrição: Controle de cota das chamadas ao Google Sheets: token buckets de leitura e escrita,
+#            novas tentativas com backoff e jitter em 429/5xx e métricas de latência por operação.
+
+import logging
+import random
+import threading
+import time
+import gspread
+import requests
+import urllib3
+from app.services.api_football_client import TokenBucket, parse_retry_after
+
+class SheetsQuota:
+    """
+    Toda chamada ao Sheets passa por `read` ou `write`. Acima do orçamento por minuto a
+    chamada espera na própria thread (fila implícita do bucket) em vez de estourar a cota;
+    um 429 esvazia o bucket correspondente, para que as próximas chamadas também esperem.
+    Escritas só são repetidas quando com certeza não foram aplicadas (429 ou falha ao conectar,
+    inclusive DNS e conexão recusada): um 5xx, timeout de leitura ou queda no meio da resposta não
+    garante isso, e repetir um append ou uma exclusão por índice pode duplicar ou apagar linhas.
+    Nesses casos o erro sobe para quem chamou (o outbox).
+    """
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    MAX_BACKOFF_SECONDS = 64.0
+
+    def __init__(self, reads_per_minute=60, writes_per_minute=60, max_retries=5):
+        self.buckets = {'read': TokenBucket(reads_per_minute), 'write': TokenBucket(writes_per_minute)}
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self.stats = {}   # operação -> contadores
+
+    @staticmethod
+    def _status(error):
+        if isinstance(error, gspread.exceptions.APIError):
+            code = getattr(error, 'code', None)
+            response = getattr(error, 'response', None)
+            return code if isinstance(code, int) else getattr(response, 'status_code', None)
+        return None
+
+    @staticmethod
+    def _never_sent(error):
+        """Falha ao abrir a conexão (timeout, DNS, recusada): a requisição nem chegou a sair."""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.exceptions.ConnectionError):
+            return False
+        # Queda no meio da resposta também é ConnectionError, mas aí a escrita pode ter sido aplicada.
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, 'reason', reason)   # MaxRetryError embrulha o erro original
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+    def _retryable(self, kind, error, status):
+        if status == 429 or self._never_sent(error):
+            return True
+        return kind == 'read' and (status is None or status in self.RETRY_STATUS)
+
+    @classmethod
+    def is_permanent(cls, error):
+        """Erro 4xx (exceto 408/429): repetir a mesma chamada não vai resolver."""
+        status = cls._status(error)
+        return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+    @staticmethod
+    def _retry_after(error):
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        return parse_retry_after(headers.get('Retry-After'))
+
+    def _record(self, op, **deltas):
+        with self._lock:
+            entry = self.stats.setdefault(op, {'calls': 0, 'errors': 0, 'retries': 0, 'throttled_s': 0.0,
+                                               'latency_s': 0.0, 'max_latency_s': 0.0})
+            for key, value in deltas.items():
+                if key == 'max_latency_s':
+                    entry[key] = max(entry[key], value)
+                else:
+                    entry[key] += value
+
+    def _call(self, kind, op, fn, *args, **kwargs):
+        bucket = self.buckets[kind]
+        for attempt in range(self.max_retries + 1):
+            self._record(op, throttled_s=bucket.acquire())
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+                elapsed = time.monotonic() - started
+                self._record(op, calls=1, latency_s=elapsed, max_latency_s=elapsed)
+                return result
+            except (gspread.exceptions.APIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                status = self._status(e)
+                if not self._retryable(kind, e, status) or attempt == self.max_retries:
+                    self._record(op, errors=1)
+                    raise
+                if status == 429:
+                    bucket.drain()
+                delay = self._retry_after(e) or min(self.MAX_BACKOFF_SECONDS, 2 ** attempt) * (0.5 + random.random())
+                self._record(op, retries=1)
+                logging.warning(f"[Sheets] '{op}' falhou ({status or e}). Nova tentativa em {delay:.1f}s...")
+                time.sleep(delay)
+
+    def read(self, op, fn, *args, **kwargs):
+        return self._call('read', op, fn, *args, **kwargs)
+
+    def write(self, op, fn, *args, **kwargs):
+        return self._call('write', op, fn, *args, **kwargs)
+
+    def summary(self):
+        with self._lock:
+            parts = [
+                f"{op}: {s['calls']} ok, {s['errors']} erros, {s['retries']} retries, "
+                f"média {s['latency_s'] / s['calls'] if s['calls'] else 0:.2f}s, máx {s['max_latency_s']:.2f}s, "
+                f"espera {s['throttled_s']:.1f}s"
+                for op, s in sorted(self.stats.items())
+            ]
+        return "[Sheets] " + (" | ".join(parts) if parts else "nenhuma chamada.")
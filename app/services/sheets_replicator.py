@@ -0,0 +1,168 @@
+# Arquivo: app/services/sheets_replicator.py
+# Descrição: Replicação assíncrona do registro local de apostas (outbox do BetLedger) para o Google Sheets.
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import Future
+
+class SheetsReplicator:
+    """
+    Uma thread de E/S dedicada consome o outbox do BetLedger em ordem, a cada `batch_size`
+    operações ou `flush_interval` segundos. Operações consecutivas do mesmo tipo viram uma
+    única chamada (`handlers[tipo](ops)`), por exemplo um `append_rows` para várias apostas.
+    O handler retorna os ids que não puderam ser aplicados (ou levanta exceção para o grupo
+    inteiro); essas operações voltam para a fila e são tentadas de novo com backoff, e as
+    operações seguintes da mesma aposta esperam por elas para não chegarem fora de ordem.
+    Só erros que `is_permanent(erro)` reconhece (e ids não aplicados) podem levar ao descarte.
+    Entrega "pelo menos uma vez": uma queda entre a chamada e a baixa no outbox pode repeti-la.
+    """
+    MAX_OPS_PER_FLUSH = 500
+    MAX_BACKOFF_SECONDS = 60.0
+
+    def __init__(self, ledger, handlers, batch_size=20, flush_interval=5.0, is_permanent=None):
+        self.ledger = ledger
+        self.handlers = handlers                      # tipo -> callable(ops) -> ids com falha
+        self.is_permanent = is_permanent or (lambda error: False)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._futures = {}                            # id no outbox -> Future
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._failures_in_row = 0
+        self.stats = {'ops': 0, 'calls': 0, 'failures': 0}
+
+        self._pending = self.ledger.outbox_count()
+        # Sobras de uma execução anterior são enviadas sem esperar o intervalo.
+        self._oldest = time.monotonic() - flush_interval if self._pending else None
+        if self._pending:
+            logging.warning(f"[Sheets] {self._pending} operações pendentes no outbox local. Reenviando...")
+            self.start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sheets-replicator", daemon=True)
+                self._thread.start()
+
+    def submit(self, op_id):
+        """Avisa que `op_id` entrou no outbox. Retorna um Future resolvido quando ela chegar à planilha."""
+        future = Future()
+        with self._cond:
+            if op_id is not None:
+                self._futures[op_id] = future
+            self._pending += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if self._pending >= self.batch_size:
+                self._cond.notify()
+        self.start()
+        return future
+
+    def _due(self):
+        if self._closing: return True
+        if not self._pending: return False
+        return self._pending >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due():
+                    timeout = None if not self._pending else max(0.0, self._oldest + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                if self._closing and not self._pending:
+                    return
+
+            if self._flush_once():
+                self._failures_in_row = 0
+                continue
+
+            self._failures_in_row += 1
+            if self._closing:
+                return
+            delay = min(self.MAX_BACKOFF_SECONDS, 2 ** self._failures_in_row) * (0.5 + random.random())
+            logging.warning(f"[Sheets] Nova tentativa de replicação em {delay:.1f}s.")
+            with self._cond:
+                self._cond.wait(delay)
+
+    @staticmethod
+    def _runs(ops):
+        """Agrupa operações consecutivas do mesmo tipo, preservando a ordem."""
+        runs = []
+        for op in ops:
+            if runs and runs[-1][0] == op[1]:
+                runs[-1][1].append(op)
+            else:
+                runs.append((op[1], [op]))
+        return runs
+
+    def _flush_once(self):
+        """Replica um lote do outbox. Retorna False se alguma operação falhou."""
+        ops = self.ledger.claim_outbox(self.owner, self.MAX_OPS_PER_FLUSH)
+        blocked_bets = set()
+        ok = True
+        for op_type, group in self._runs(ops):
+            skipped = [op for op in group if op[2] is not None and op[2] in blocked_bets]
+            group = [op for op in group if op not in skipped]
+            if skipped:
+                self.ledger.outbox_release([op[0] for op in skipped])
+            if not group: continue
+
+            try:
+                failed_ids = set(self.handlers[op_type](group) or ())
+                error, permanent = "aposta ainda não encontrada na planilha", True
+            except Exception as e:
+                failed_ids = {op[0] for op in group}
+                error, permanent = e, self.is_permanent(e)
+            if failed_ids:
+                ok = False
+                self.stats['failures'] += 1
+                blocked_bets.update(op[2] for op in group if op[0] in failed_ids and op[2] is not None)
+                self.ledger.outbox_release(list(failed_ids), error, permanent)
+                logging.error(f"[Sheets] Falha ao replicar {len(failed_ids)} operações '{op_type}' (mantidas no outbox): {error}")
+            done_ids = [op[0] for op in group if op[0] not in failed_ids]
+            if done_ids:
+                self._done(done_ids)
+                self.stats['calls'] += 1
+                self.stats['ops'] += len(done_ids)
+                logging.info(f"[Sheets] {len(done_ids)} operações '{op_type}' replicadas em uma única chamada.")
+
+        with self._cond:
+            self._pending = self.ledger.outbox_count()
+            self._oldest = time.monotonic() if self._pending else None
+        return ok
+
+    def _done(self, op_ids):
+        self.ledger.outbox_done(op_ids)
+        with self._cond:
+            futures = [self._futures.pop(i, None) for i in op_ids]
+        for future in futures:
+            if future is not None:
+                future.set_result(True)
+
+    def flush(self, timeout=None):
+        """Força a replicação imediata e aguarda (até `timeout`) o outbox esvaziar."""
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._cond:
+            if self._pending:
+                self._oldest = time.monotonic() - self.flush_interval
+                self._cond.notify()
+        self.start()
+        while self._pending and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.05)
+        return self._pending == 0
+
+    def close(self, timeout=30):
+        """Tenta uma última replicação e encerra a thread. O que sobrar fica no outbox para o próximo início."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._pending:
+            logging.warning(f"[Sheets] {self._pending} operações ficaram no outbox e serão replicadas no próximo início.")
@@ -1,28 +1,52 @@
 # Arquivo: app/services/sheets_service.py
 # Versão: Final - Lógica para aba principal "APOSTAS" e arquivamento automático.
+#         Registro local (BetLedger) como fonte da verdade; a planilha é replicada em lote por uma
+#         thread de E/S (SheetsReplicator). Leituras da aba principal servidas por um espelho local.
+#         Toda chamada à API passa pelo SheetsQuota (cota de leitura/escrita, backoff em 429/5xx).
 
 import json
+import threading
 from datetime import datetime, timedelta
 import gspread
 import pandas as pd
 from babel.dates import format_date
 import logging
 from app.config import config
+from app.services.sheets_replicator import SheetsReplicator
+from app.services.sheet_mirror import SheetMirror
+from app.services.bet_ledger import BetLedger
+from app.services.sheets_quota import SheetsQuota
 
 class SheetsService:
     EXPECTED_HEADER = [
         'Dia do Mês', 'Tipster', 'Casa de Apostas', 'Tipo de Aposta', 'Jogos',
         'Descrição da Aposta', 'Entrada', 'ESPORTE', 'ODD', 'Unidade/%', 
-        'Situação', 'Bet ID', 'Message Link', 'Data Completa', 'Home Team ID', 'Away Team ID'
+        'Situação', 'Bet ID', 'Message Link', 'Data Completa', 'Home Team ID', 'Away Team ID', 'Fixture ID'
     ]
     MAIN_WORKSHEET_NAME = "APOSTAS"
+    COMPLETED_STATUSES = ['green', 'red', 'revisão manual', 'erro na análise', 'erro ia']
+    # Acima disso, recarregar a aba inteira sai mais barato do que buscar linha a linha.
+    MAX_INCREMENTAL_RANGES = 100
 
     def __init__(self, cfg: config):
         self.config = cfg
         self.client = self._authenticate()
         if not self.client:
             raise RuntimeError("Não foi possível autenticar com o Google Sheets.")
-        self.spreadsheet = self.client.open_by_key(self.config.SPREADSHEET_ID)
+        self.quota = SheetsQuota(
+            reads_per_minute=self.config.SHEETS_READS_PER_MINUTE,
+            writes_per_minute=self.config.SHEETS_WRITES_PER_MINUTE,
+            max_retries=self.config.SHEETS_MAX_RETRIES,
+        )
+        self.spreadsheet = self.quota.read('open_by_key', self.client.open_by_key, self.config.SPREADSHEET_ID)
+        # Abas já abertas e com cabeçalho conferido: evita worksheet() + row_values(1) a cada gravação.
+        self._worksheets = {}
+        self._worksheets_lock = threading.Lock()
+        self._ledger = None
+        self._replicator = None
+        self._mirror = None
+        # Um append que falhou sem resposta clara pode ter sido aplicado: confere antes de reenviar.
+        self._appends_uncertain = False
 
     def _authenticate(self):
         try:
@@ -36,23 +60,192 @@ class SheetsService:
             return None
 
     def _get_or_create_worksheet(self, title):
+        with self._worksheets_lock:
+            worksheet = self._worksheets.get(title)
+        if worksheet is not None:
+            return worksheet
+
         try:
-            worksheet = self.spreadsheet.worksheet(title)
+            worksheet = self.quota.read('worksheet', self.spreadsheet.worksheet, title)
         except gspread.exceptions.WorksheetNotFound:
             logging.warning(f"Aba '{title}' não encontrada. Criando uma nova...")
-            worksheet = self.spreadsheet.add_worksheet(title=title, rows="1", cols=len(self.EXPECTED_HEADER))
+            worksheet = self.quota.write('add_worksheet', self.spreadsheet.add_worksheet,
+                                         title=title, rows="1", cols=len(self.EXPECTED_HEADER))
         
         # Garante que o cabeçalho esteja correto
-        header = worksheet.row_values(1)
+        header = self.quota.read('row_values', worksheet.row_values, 1)
         if header != self.EXPECTED_HEADER:
-            worksheet.update([self.EXPECTED_HEADER], 'A1')
-            worksheet.format('A1:P1', {'textFormat': {'bold': True}})
+            # Abas mensais antigas foram criadas com menos colunas; a grade precisa caber o cabeçalho novo.
+            missing_cols = len(self.EXPECTED_HEADER) - worksheet.col_count
+            if missing_cols > 0:
+                self.quota.write('add_cols', worksheet.add_cols, missing_cols)
+            self.quota.write('update', worksheet.update, [self.EXPECTED_HEADER], 'A1')
+            header_range = f"A1:{gspread.utils.rowcol_to_a1(1, len(self.EXPECTED_HEADER))}"
+            self.quota.write('format', worksheet.format, header_range, {'textFormat': {'bold': True}})
+        with self._worksheets_lock:
+            self._worksheets[title] = worksheet
         return worksheet
 
+    def _forget_worksheet(self, title):
+        """Descarta a aba do cache (ex.: após um erro), forçando nova abertura e conferência do cabeçalho."""
+        with self._worksheets_lock:
+            self._worksheets.pop(title, None)
+
+    @property
+    def ledger(self):
+        if self._ledger is None:
+            self._ledger = BetLedger(self.config.LEDGER_PATH)
+        return self._ledger
+
+    @property
+    def replicator(self):
+        """Criado no primeiro uso: processos que só leem a planilha não sobem a thread de E/S."""
+        if self._replicator is None:
+            # Operações descartadas numa execução anterior ganham nova chance a cada início.
+            self.ledger.revive_dead()
+            self._replicator = SheetsReplicator(
+                self.ledger,
+                {'append': self._replicate_appends, 'update': self._replicate_updates, 'archive': self._replicate_archive},
+                batch_size=self.config.SHEETS_BATCH_SIZE,
+                flush_interval=self.config.SHEETS_FLUSH_INTERVAL_SECONDS,
+                is_permanent=SheetsQuota.is_permanent,
+            )
+        return self._replicator
+
+    # --- Handlers de replicação (executados na thread do SheetsReplicator) ---
+
+    def _replicate_appends(self, ops):
+        worksheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
+        if self._appends_uncertain:
+            self.sync_mirror()
+            present = self.mirror.rows_for_bet_ids({bet_id for _, _, bet_id, _ in ops})
+            if present:
+                logging.warning(f"[Sheets] {len(present)} apostas já estavam na planilha após uma falha anterior. Não serão reenviadas.")
+            ops = [op for op in ops if op[2] not in present]
+            if not ops:
+                self._appends_uncertain = False
+                return []
+        try:
+            self.quota.write('append_rows', worksheet.append_rows,
+                             [payload['row'] for _, _, _, payload in ops], value_input_option='USER_ENTERED')
+        except Exception:
+            self._appends_uncertain = True
+            self._forget_worksheet(self.MAIN_WORKSHEET_NAME)
+            raise
+        self._appends_uncertain = False
+        return []
+
+    def _replicate_updates(self, ops):
+        # A posição das linhas pode ter mudado (arquivamento, edição manual): confere antes de escrever.
+        self.sync_mirror()
+        rows_by_bet = self.mirror.rows_for_bet_ids({bet_id for _, _, bet_id, _ in ops})
+        updates, failed = [], []
+        for op_id, _, bet_id, payload in ops:
+            row = rows_by_bet.get(bet_id)
+            if row is None:
+                failed.append(op_id)
+                continue
+            updates.extend({'row': row, 'col_name': col, 'value': value} for col, value in payload['changes'].items())
+        if updates:
+            self._write_cells(updates)
+        return failed
+
+    def _replicate_archive(self, ops):
+        archived = self._archive_now()
+        if archived:
+            self.ledger.mark_archived(archived)
+
+    @property
+    def mirror(self):
+        if self._mirror is None:
+            self._mirror = SheetMirror(self.config.SHEET_MIRROR_PATH)
+        return self._mirror
+
+    @staticmethod
+    def _values_to_records(header, rows, first_row):
+        """Linhas cruas (strings) -> [(número da linha, registro)], com números convertidos como no get_all_records."""
+        records = []
+        for offset, row in enumerate(rows):
+            values = gspread.utils.numericise_all(list(row) + [''] * (len(header) - len(row)))
+            records.append((first_row + offset, dict(zip(header, values))))
+        return records
+
+    def _column_range(self, col_name):
+        col_letter = gspread.utils.rowcol_to_a1(1, self.EXPECTED_HEADER.index(col_name) + 1).rstrip('0123456789')
+        return f"{col_letter}2:{col_letter}"
+
+    def sync_mirror(self, full=False):
+        """
+        Atualiza o espelho da aba principal. Normalmente lê só as colunas Bet ID e Situação
+        e busca por inteiro apenas as linhas novas ou alteradas; `full=True` (ou espelho
+        vazio) relê a aba inteira. Retorna os registros que mudaram.
+        """
+        worksheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
+        mirror = self.mirror
+        if full or not mirror.count():
+            values = self.quota.read('get_all_values', worksheet.get_all_values)
+            header = values[0] if values else self.EXPECTED_HEADER
+            rows = self._values_to_records(header, values[1:], first_row=2)
+            mirror.replace_all(rows)
+            return [record for _, record in rows]
+
+        bet_ids, statuses = self.quota.read(
+            'batch_get', worksheet.batch_get, [self._column_range('Bet ID'), self._column_range('Situação')]
+        )
+        total = max(len(bet_ids), len(statuses))
+        def cell(column, i):
+            return str(column[i][0]).strip() if i < len(column) and column[i] else ''
+
+        known = mirror.fingerprint()
+        changed = [
+            i + 2 for i in range(total)
+            if known.get(i + 2) != (cell(bet_ids, i), cell(statuses, i).lower())
+        ]
+        if not changed:
+            mirror.apply_changes([], last_row=total + 1)
+            return []
+
+        ranges = self._coalesce_row_ranges(changed)
+        if len(ranges) > self.MAX_INCREMENTAL_RANGES:
+            logging.info(f"[Espelho] {len(changed)} linhas alteradas em {len(ranges)} trechos. Recarregando a aba inteira.")
+            return self.sync_mirror(full=True)
+
+        rows = self._fetch_rows(worksheet, ranges)
+        mirror.apply_changes(rows, last_row=total + 1)
+        logging.info(f"[Espelho] {len(rows)} linhas novas ou alteradas sincronizadas da planilha.")
+        return [record for _, record in rows]
+
+    def _fetch_rows(self, worksheet, ranges):
+        """Lê por inteiro os intervalos de linhas [(início, fim)] em uma chamada: [(número da linha, registro)]."""
+        last_col = gspread.utils.rowcol_to_a1(1, len(self.EXPECTED_HEADER)).rstrip('0123456789')
+        fetched = self.quota.read('batch_get', worksheet.batch_get, [f"A{start}:{last_col}{end}" for start, end in ranges])
+        rows = []
+        for (start, end), values in zip(ranges, fetched):
+            padded = list(values) + [[]] * (end - start + 1 - len(values))
+            rows.extend(self._values_to_records(self.EXPECTED_HEADER, padded, first_row=start))
+        return rows
+
+    def refresh_rows(self, row_numbers):
+        """
+        Relê todas as colunas das linhas indicadas e atualiza o espelho. A sincronização incremental
+        só compara Bet ID e Situação; antes de liquidar ou arquivar, é isto que traz correções
+        manuais nas outras colunas (Entrada, ODD, data...). Retorna os registros relidos.
+        """
+        ranges = self._coalesce_row_ranges(row_numbers)
+        if not ranges: return []
+        if len(ranges) > self.MAX_INCREMENTAL_RANGES:
+            return self.sync_mirror(full=True)
+        rows = self._fetch_rows(self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME), ranges)
+        self.mirror.put_rows(rows)
+        return [record for _, record in rows]
+
     def get_all_records_from_worksheet(self, worksheet_name):
         try:
-            worksheet = self.spreadsheet.worksheet(worksheet_name)
-            return worksheet.get_all_records()
+            if worksheet_name == self.MAIN_WORKSHEET_NAME:
+                self.sync_mirror()
+                return [{k: v for k, v in r.items() if k != 'row_number'} for r in self.mirror.all_records()]
+            worksheet = self.quota.read('worksheet', self.spreadsheet.worksheet, worksheet_name)
+            return self.quota.read('get_all_records', worksheet.get_all_records)
         except gspread.exceptions.WorksheetNotFound:
             logging.warning(f"A aba '{worksheet_name}' não foi encontrada para leitura.")
             return []
@@ -61,22 +254,22 @@ class SheetsService:
             return []
 
     def get_pending_bets(self):
-        all_records = self.get_all_records_from_worksheet(self.MAIN_WORKSHEET_NAME)
-        if not all_records: return None
-        
-        df = pd.DataFrame(all_records)
-        if df.empty: return None
-
-        df['row_number'] = df.index + 2
-        
-        pending_bets = df[df['Situação'].astype(str).str.strip().str.lower() == 'pendente'].copy()
-        if pending_bets.empty: return None
+        # Apostas criadas por outro processo (ou editadas à mão) chegam ao ledger pelo espelho.
+        check_time = datetime.now() - timedelta(hours=self.config.RESULT_CHECK_HOURS_AGO)
+        try:
+            self.ledger.adopt(self.sync_mirror())
+            # As apostas a liquidar são relidas por inteiro: vale a versão corrigida à mão na planilha.
+            rows = self.mirror.rows_for_bet_ids([bet.get('Bet ID') for bet in self.ledger.pending_before(check_time)])
+            self.ledger.adopt(self.refresh_rows(rows.values()))
+        except Exception as e:
+            logging.error(f"Erro ao sincronizar com a planilha (usando o registro local): {e}")
+        pending = self.ledger.pending_before(check_time)
+        if not pending: return None
 
+        # Consulta indexada (Situação + data do evento) no registro local, em vez da aba inteira.
+        pending_bets = pd.DataFrame(pending)
         pending_bets['event_datetime'] = pd.to_datetime(pending_bets['Data Completa'], dayfirst=True, errors='coerce')
-        valid_dates_bets = pending_bets.dropna(subset=['event_datetime']).copy()
-
-        check_time = datetime.now() - timedelta(hours=self.config.RESULT_CHECK_HOURS_AGO)
-        return valid_dates_bets[valid_dates_bets['event_datetime'] <= check_time]
+        return pending_bets.dropna(subset=['event_datetime'])
 
     def _format_json_to_row_data(self, bet_json, message_link, existing_bet_id=None, existing_status=None):
         bet_info = bet_json.get('data', bet_json)
@@ -111,69 +304,115 @@ class SheetsService:
             'Message Link': message_link,
             'Data Completa': data_evento_str,
             'Home Team ID': bet_info.get('home_team_id'),
-            'Away Team ID': bet_info.get('away_team_id')
+            'Away Team ID': bet_info.get('away_team_id'),
+            'Fixture ID': bet_info.get('fixture_id')
         }
 
     def write_bet(self, bet_json, message_link):
-        worksheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
+        """
+        Não bloqueia: a aposta é gravada no registro local e replicada em lote pela thread de E/S.
+        Retorna um concurrent.futures.Future (use `asyncio.wrap_future` para aguardar), ou None.
+        """
         row_data = self._format_json_to_row_data(bet_json, message_link)
-        if not row_data: return
+        if not row_data: return None
         
         ordered_row = [str(row_data.get(h, '')) for h in self.EXPECTED_HEADER]
-        worksheet.append_row(ordered_row, value_input_option='USER_ENTERED')
-        logging.info(f"Aposta para '{row_data.get('Jogos')}' planilhada com sucesso na aba '{worksheet.title}'.")
+        # O registro guarda os valores como a planilha os devolve, para comparações futuras com o espelho.
+        record = dict(zip(self.EXPECTED_HEADER, gspread.utils.numericise_all(ordered_row)))
+        future = self.replicator.submit(self.ledger.add_bet(record, ordered_row))
+        logging.info(f"Aposta para '{row_data.get('Jogos')}' registrada e enfileirada para a aba '{self.MAIN_WORKSHEET_NAME}'.")
+        return future
+
+    def record_updates(self, updates):
+        """
+        Liquidação: grava as mudanças no registro local e agenda a replicação.
+        `updates` = [{'bet_id', 'col_name', 'value'}]; não espera pelo Google.
+        """
+        by_bet = {}
+        for update in updates:
+            by_bet.setdefault(update['bet_id'], {})[update['col_name']] = update['value']
+        for bet_id, changes in by_bet.items():
+            self.replicator.submit(self.ledger.update_fields(bet_id, changes))
+        logging.info(f"{len(updates)} atualizações registradas para {len(by_bet)} apostas; replicação em segundo plano.")
+
+    def close(self, timeout=30):
+        """Replica o que estiver no outbox antes de encerrar o processo."""
+        if self._replicator is not None:
+            self._replicator.close(timeout)
+        logging.info(self.quota.summary())
     
     def batch_update_cells(self, updates: list):
+        """
+        Escrita direta, por número de linha. Falhas temporárias já são repetidas pelo SheetsQuota;
+        o erro que sobrar é propagado, para que o chamador não dê a escrita como feita.
+        """
         if not updates: return
-        worksheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
         try:
-            header = worksheet.row_values(1)
-            col_map = {name: i + 1 for i, name in enumerate(header)}
-            batch_requests = []
-            for update in updates:
-                row, col_name, value = update.get('row'), update.get('col_name'), update.get('value')
-                if not all([row, col_name, value is not None]): continue
-                col_index = col_map.get(col_name)
-                if col_index:
-                    cell_a1 = gspread.utils.rowcol_to_a1(row, col_index)
-                    batch_requests.append({'range': cell_a1, 'values': [[value]]})
-            
-            if batch_requests:
-                worksheet.batch_update(batch_requests, value_input_option='USER_ENTERED')
-                logging.info(f"{len(updates)} células atualizadas na aba '{worksheet.title}' com sucesso.")
+            self._write_cells(updates)
         except Exception as e:
             logging.error(f"Erro ao executar a atualização em lote: {e}")
+            raise
+
+    def _write_cells(self, updates):
+        """Atualiza células por linha ({'row', 'col_name', 'value'}) em uma única chamada e reflete no espelho."""
+        worksheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
+        # O cabeçalho já foi conferido (e corrigido) ao abrir a aba.
+        col_map = {name: i + 1 for i, name in enumerate(self.EXPECTED_HEADER)}
+        batch_requests = []
+        applied = []
+        for update in updates:
+            row, col_name, value = update.get('row'), update.get('col_name'), update.get('value')
+            if not all([row, col_name, value is not None]): continue
+            col_index = col_map.get(col_name)
+            if col_index:
+                cell_a1 = gspread.utils.rowcol_to_a1(row, col_index)
+                batch_requests.append({'range': cell_a1, 'values': [[value]]})
+                applied.append(update)
+        
+        if batch_requests:
+            self.quota.write('batch_update', worksheet.batch_update, batch_requests, value_input_option='USER_ENTERED')
+            self.mirror.update_cells(applied)
+            logging.info(f"{len(applied)} células atualizadas na aba '{worksheet.title}' com sucesso.")
 
     def write_reconstructed_sheet(self, df: pd.DataFrame, title: str):
         worksheet = self._get_or_create_worksheet(title)
         logging.info(f"Escrevendo {len(df)} linhas na aba de reconstrução '{title}'...")
         df_to_write = df.reindex(columns=self.EXPECTED_HEADER).fillna('')
-        worksheet.update([self.EXPECTED_HEADER] + df_to_write.values.tolist(), 'A1', value_input_option='USER_ENTERED')
+        self.quota.write('update', worksheet.update, [self.EXPECTED_HEADER] + df_to_write.values.tolist(), 'A1',
+                         value_input_option='USER_ENTERED')
         logging.info(f"Planilha reconstruída salva com sucesso na aba '{title}'.")
         
     def archive_completed_bets(self):
+        """Agenda o arquivamento; ele roda na thread de replicação, depois das atualizações já registradas."""
+        self.replicator.submit(self.ledger.request_archive())
+        logging.info("Arquivamento de apostas finalizadas agendado.")
+
+    def _archive_now(self):
+        """Executa o arquivamento. Retorna {Bet ID: aba mensal} das apostas arquivadas."""
         logging.info("Iniciando processo de arquivamento de apostas finalizadas...")
         main_sheet = self._get_or_create_worksheet(self.MAIN_WORKSHEET_NAME)
-        all_records = main_sheet.get_all_records()
-        if not all_records:
-            logging.info("Nenhuma aposta para arquivar.")
-            return
-
-        df = pd.DataFrame(all_records)
-        df['row_number'] = df.index + 2
-        
-        completed_statuses = ['green', 'red', 'revisão manual', 'erro na análise', 'erro ia']
-        completed_bets = df[df['Situação'].str.lower().isin(completed_statuses)].copy()
-        if completed_bets.empty:
+        # Os números de linha usados nas exclusões precisam refletir a planilha neste momento.
+        self.sync_mirror()
+        # O que vai para a aba mensal é a linha atual da planilha, não a cópia do espelho.
+        self.refresh_rows([bet['row_number'] for bet in self.mirror.by_status(self.COMPLETED_STATUSES)])
+        completed = self.mirror.by_status(self.COMPLETED_STATUSES)
+        if not completed:
             logging.info("Nenhuma aposta finalizada para arquivar.")
-            return
+            return {}
+
+        completed_bets = pd.DataFrame(completed)
 
         completed_bets['event_date'] = pd.to_datetime(completed_bets['Data Completa'], dayfirst=True, errors='coerce')
         completed_bets.dropna(subset=['event_date'], inplace=True)
         
         bets_by_month = completed_bets.groupby(completed_bets['event_date'].dt.to_period('M'))
+        cells = self._fetch_cells(main_sheet, completed_bets['row_number'].tolist())
         
+        # Tudo vai em um único batchUpdate: as cópias para as abas mensais e as remoções na
+        # aba principal são aplicadas juntas (tudo ou nada), sem deixar a planilha pela metade.
+        append_requests = []
         rows_to_delete = []
+        archived = {}
         for period, bets_in_month in bets_by_month:
             month_sheet_name = format_date(period.to_timestamp(), "MMMM-YYYY", locale='pt_BR').capitalize()
             if month_sheet_name == self.MAIN_WORKSHEET_NAME: continue # Não arquiva na própria aba
@@ -181,19 +420,63 @@ class SheetsService:
             logging.info(f"Arquivando {len(bets_in_month)} apostas para '{month_sheet_name}'...")
             month_sheet = self._get_or_create_worksheet(month_sheet_name)
             
-            bets_to_write_df = bets_in_month.reindex(columns=self.EXPECTED_HEADER).fillna('')
-            rows_to_append = bets_to_write_df.values.tolist()
-            month_sheet.append_rows(rows_to_append, value_input_option='USER_ENTERED')
-            
+            append_requests.append({'appendCells': {
+                'sheetId': month_sheet.id,
+                'rows': [{'values': cells[row_number]} for row_number in bets_in_month['row_number']],
+                'fields': 'userEnteredValue,userEnteredFormat',
+            }})
             rows_to_delete.extend(bets_in_month['row_number'].tolist())
+            archived.update({str(bet_id): month_sheet_name for bet_id in bets_in_month['Bet ID'] if str(bet_id).strip()})
+
+        if not append_requests:
+            logging.info("Nenhuma aposta finalizada para arquivar.")
+            return {}
 
-        if rows_to_delete:
-            logging.info(f"Removendo {len(rows_to_delete)} linhas arquivadas da aba '{self.MAIN_WORKSHEET_NAME}'...")
-            # Deleta as linhas em lotes, da última para a primeira
-            for row_num in sorted(rows_to_delete, reverse=True):
-                try:
-                    main_sheet.delete_rows(row_num)
-                except Exception as e:
-                    logging.error(f"Erro ao deletar linha {row_num}: {e}")
+        # Linhas contíguas viram um único deleteDimension; de baixo para cima, para os índices continuarem válidos.
+        delete_requests = [
+            {'deleteDimension': {'range': {
+                'sheetId': main_sheet.id, 'dimension': 'ROWS', 'startIndex': start - 1, 'endIndex': end,
+            }}}
+            for start, end in reversed(self._coalesce_row_ranges(rows_to_delete))
+        ]
+        logging.info(f"Removendo {len(rows_to_delete)} linhas arquivadas da aba '{self.MAIN_WORKSHEET_NAME}' "
+                     f"em {len(delete_requests)} intervalos...")
+        # Em caso de erro nada é aplicado; a exceção devolve a operação ao outbox para nova tentativa.
+        self.quota.write('spreadsheet.batch_update', self.spreadsheet.batch_update, {'requests': append_requests + delete_requests})
+        self.mirror.delete_rows(rows_to_delete)
         
-        logging.info("Processo de arquivamento concluído.")
\ No newline at end of file
+        logging.info("Processo de arquivamento concluído.")
+        return archived
+
+    def _fetch_cells(self, worksheet, row_numbers):
+        """
+        {linha: [CellData]} com o valor e o formato exatos de cada célula (userEnteredValue/Format).
+        Copiar isso preserva números, datas e fórmulas como estão, independentemente da
+        localidade da planilha (o valor formatado '1,85' não volta a ser número sozinho).
+        """
+        last_col = gspread.utils.rowcol_to_a1(1, len(self.EXPECTED_HEADER)).rstrip('0123456789')
+        ranges = [f"'{worksheet.title}'!A{start}:{last_col}{end}" for start, end in self._coalesce_row_ranges(row_numbers)]
+        metadata = self.quota.read('fetch_sheet_metadata', self.spreadsheet.fetch_sheet_metadata, params={
+            'includeGridData': 'true',
+            'ranges': ranges,
+            'fields': 'sheets(data(startRow,rowData(values(userEnteredValue,userEnteredFormat))))',
+        })
+        cells = {}
+        for grid in metadata['sheets'][0].get('data', []):
+            first_row = grid.get('startRow', 0) + 1
+            for offset, row_data in enumerate(grid.get('rowData', [])):
+                values = row_data.get('values', [])[:len(self.EXPECTED_HEADER)]
+                cells[first_row + offset] = values + [{}] * (len(self.EXPECTED_HEADER) - len(values))
+        # Linhas sem dados vêm omitidas no fim de cada intervalo.
+        return {row: cells.get(row, [{}] * len(self.EXPECTED_HEADER)) for row in row_numbers}
+
+    @staticmethod
+    def _coalesce_row_ranges(row_numbers):
+        """[5, 2, 3, 9, 4] -> [(2, 5), (9, 9)]: intervalos fechados de linhas contíguas, em ordem crescente."""
+        ranges = []
+        for row in sorted(set(row_numbers)):
+            if ranges and row == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], row)
+            else:
+                ranges.append((row, row))
+        return ranges
@@ -0,0 +1,116 @@
+# Arquivo: app/services/team_mapping_store.py
+# Descrição: Armazenamento durável e incremental do mapa nome -> ID de times (SQLite em modo WAL).
+
+import os
+import json
+import logging
+import time
+from app.services.json_index_store import JsonIndexStore
+
+class TeamMappingStore(JsonIndexStore):
+    """
+    Cada alias novo é uma única linha gravada atomicamente (O(1)), em vez de
+    reescrever o team_mappings.json inteiro. O modo WAL permite que o worker,
+    o results_updater e o auditor leiam e gravem ao mesmo tempo com segurança.
+    O JSON continua existindo como exportação, gerada por `export_json`, e é
+    reimportado automaticamente quando regenerado (ex.: pelo build_alias_map).
+    """
+    LABEL = "Mapeamentos"
+
+    def _create_schema(self, conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS team_mappings (
+                name TEXT PRIMARY KEY,
+                team_id INTEGER,
+                updated_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(team_mappings)')}
+        if 'attempts' not in columns:
+            conn.execute('ALTER TABLE team_mappings ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+
+    def _import_rows(self, conn, data):
+        # Aliases aprendidos em produção prevalecem; o JSON só preenche nomes novos ou ainda sem ID.
+        now = time.time()
+        rows = [(str(k).lower(), v, now) for k, v in data.items()]
+        conn.executemany('''
+            INSERT INTO team_mappings (name, team_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET team_id = excluded.team_id, updated_at = excluded.updated_at, attempts = 0
+            WHERE team_mappings.team_id IS NULL AND excluded.team_id IS NOT NULL
+        ''', rows)
+        return len(rows)
+
+    def resolved_items(self):
+        """Lista [(nome, team_id)] apenas dos nomes com ID conhecido (base do índice aproximado)."""
+        with self._lock:
+            return self.conn.execute('SELECT name, team_id FROM team_mappings WHERE team_id IS NOT NULL').fetchall()
+
+    def get(self, name):
+        """Retorna (encontrado, team_id). `team_id` pode ser None para nomes sabidamente sem resultado."""
+        with self._lock:
+            row = self.conn.execute('SELECT team_id FROM team_mappings WHERE name = ?', (name,)).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def set_many(self, mappings):
+        """Grava vários aliases em uma única transação."""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO team_mappings (name, team_id, updated_at, attempts) VALUES (?, ?, ?, 0)',
+                [(name, team_id, now) for name, team_id in mappings.items() if name]
+            )
+
+    # --- Cache negativo (nomes que não foram encontrados) ---
+
+    def record_negative(self, name):
+        """Registra mais uma tentativa sem sucesso para `name`; retorna o total de tentativas."""
+        with self._lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO team_mappings (name, team_id, updated_at, attempts) VALUES (?, NULL, ?, 1)
+                ON CONFLICT(name) DO UPDATE SET
+                    team_id = NULL, updated_at = excluded.updated_at, attempts = attempts + 1
+            ''', (name, time.time()))
+            return self.conn.execute('SELECT attempts FROM team_mappings WHERE name = ?', (name,)).fetchone()[0]
+
+    def get_negative(self, name):
+        """Retorna (updated_at, attempts) se `name` é um negativo registrado; senão None."""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT updated_at, attempts FROM team_mappings WHERE name = ? AND team_id IS NULL', (name,)
+            ).fetchone()
+        return (row[0], max(1, row[1])) if row else None
+
+    def list_negatives(self):
+        """Lista [(nome, updated_at, attempts)] dos negativos, do mais recente para o mais antigo."""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT name, updated_at, attempts FROM team_mappings WHERE team_id IS NULL ORDER BY updated_at DESC'
+            ).fetchall()
+
+    def purge_negatives(self, names=None):
+        """Remove os negativos informados (ou todos), forçando uma nova tentativa na próxima aparição."""
+        with self._lock, self.conn:
+            if names:
+                deleted = self.conn.executemany(
+                    'DELETE FROM team_mappings WHERE name = ? AND team_id IS NULL', [(n,) for n in names]
+                ).rowcount
+            else:
+                deleted = self.conn.execute('DELETE FROM team_mappings WHERE team_id IS NULL').rowcount
+        logging.info(f"[Mapeamentos] {deleted} nomes removidos do cache negativo.")
+        return deleted
+
+    def export_json(self, json_path=None):
+        """Compacta o banco em um JSON (gravação atômica: arquivo temporário + rename)."""
+        json_path = json_path or self.json_path
+        if not json_path: return
+        with self._lock:
+            data = dict(self.conn.execute('SELECT name, team_id FROM team_mappings ORDER BY rowid'))
+        tmp_path = f"{json_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, json_path)
+        # O JSON recém-exportado já reflete o banco: não há o que reimportar.
+        if json_path == self.json_path:
+            self._mark_synced(self.conn)
+        logging.info(f"[Mapeamentos] {len(data)} nomes exportados para '{os.path.basename(json_path)}'.")
@@ -0,0 +1,160 @@
+# Arquivo: app/services/team_name_index.py
+# Descrição: Índice aproximado (fuzzy) de nomes de times para resolução local, sem IA e sem API.
+
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# Palavras que não ajudam a distinguir clubes ("Clube Atlético", "FC", "de"...).
+STOPWORDS = {'fc', 'ec', 'sc', 'cf', 'afc', 'ac', 'cd', 'ca', 'club', 'clube', 'esporte', 'futebol',
+             'de', 'da', 'do', 'das', 'dos', 'del', 'la', 'el', 'the'}
+
+# Siglas de estado ("Palmeiras SP", "Grêmio RS"): ignoradas na comparação, exceto quando os dois
+# nomes trazem siglas diferentes (Atlético MG x Atlético GO).
+UF_CODES = {'ac', 'al', 'ap', 'am', 'ba', 'ce', 'df', 'es', 'go', 'ma', 'mt', 'ms', 'mg', 'pa', 'pb',
+            'pr', 'pe', 'pi', 'rj', 'rn', 'rs', 'ro', 'rr', 'sc', 'sp', 'se', 'to'}
+
+# Marcadores de categoria: se divergirem, são times diferentes (seleção principal x sub-21 x feminino).
+CATEGORY_RE = re.compile(r'^(?:u\d{2}|sub\d{2}|w|women|feminino|fem|ii|b|reserves?)$')
+
+def fold_name(name):
+    """Minúsculas, sem acentos e sem pontuação: 'Atlético-MG' -> 'atletico mg'."""
+    if not isinstance(name, str): return ""
+    name = unicodedata.normalize('NFKD', name.lower())
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r'\bsub[\s-]?(\d{2})\b', r'u\1', name)
+    name = re.sub(r'[^a-z0-9]+', ' ', name)
+    return name.strip()
+
+def _tokens(folded):
+    return [t for t in folded.split() if t not in STOPWORDS and t not in UF_CODES] or folded.split()
+
+def _ufs(folded):
+    return frozenset(t for t in folded.split() if t in UF_CODES)
+
+def _token_similarity(a, b):
+    """1 para tokens iguais; para palavras longas, tolera erros de digitação ('liverpoool')."""
+    if a == b: return 1.0
+    if min(len(a), len(b)) < 5: return 0.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    return ratio if ratio >= 0.8 else 0.0
+
+def _token_overlap(tokens, cand_tokens):
+    """Soma, para cada token, da melhor semelhança com um token do outro nome."""
+    return sum(max((_token_similarity(t, c) for c in cand_tokens), default=0.0) for t in tokens)
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _categories(tokens):
+    return frozenset(t for t in tokens if CATEGORY_RE.match(t))
+
+class FuzzyTeamIndex:
+    MAX_POSTING_SIZE = 3000   # trigramas muito comuns não ajudam a filtrar candidatos
+    MAX_CANDIDATES = 60
+
+    def __init__(self, threshold=0.8, min_margin=0.05):
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self._exact = {}                        # nome normalizado -> team_id
+        self._entries = []                      # [(nome normalizado, team_id, trigramas, tokens, categorias, siglas UF)]
+        self._postings = defaultdict(list)      # trigrama -> [índice da entrada]
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, name, team_id):
+        if team_id is None: return
+        folded = fold_name(name)
+        key = (folded, team_id)
+        if not folded or key in self._seen: return
+        self._seen.add(key)
+        self._exact.setdefault(folded, team_id)
+
+        core = ' '.join(_tokens(folded))
+        trigrams = _trigrams(core)
+        tokens = set(_tokens(folded))
+        idx = len(self._entries)
+        self._entries.append((folded, team_id, trigrams, tokens, _categories(tokens), _ufs(folded)))
+        for gram in trigrams:
+            self._postings[gram].append(idx)
+
+    def add_many(self, mappings):
+        """Aceita um dict {nome: id} ou uma sequência de pares (nome, id)."""
+        items = mappings.items() if hasattr(mappings, 'items') else mappings
+        for name, team_id in items:
+            self.add(name, team_id)
+
+    def search(self, name, k=5):
+        """Retorna até `k` candidatos [(score, team_id, nome)] ordenados do mais para o menos provável."""
+        folded = fold_name(name)
+        if not folded: return []
+        if folded in self._exact:
+            return [(1.0, self._exact[folded], folded)]
+
+        tokens = set(_tokens(folded))
+        core = ' '.join(_tokens(folded))
+        trigrams = _trigrams(core)
+        categories = _categories(tokens)
+        ufs = _ufs(folded)
+
+        shared = defaultdict(int)
+        for gram in trigrams:
+            posting = self._postings.get(gram)
+            if posting and len(posting) <= self.MAX_POSTING_SIZE:
+                for idx in posting:
+                    shared[idx] += 1
+        if not shared: return []
+
+        best = sorted(shared.items(), key=lambda item: item[1], reverse=True)[:self.MAX_CANDIDATES]
+        scored = []
+        for idx, common in best:
+            cand_name, team_id, cand_trigrams, cand_tokens, cand_categories, cand_ufs = self._entries[idx]
+            if cand_categories != categories: continue
+            if ufs and cand_ufs and not ufs & cand_ufs: continue
+            dice = 2 * len(trigrams & cand_trigrams) / (len(trigrams) + len(cand_trigrams))
+            overlap = _token_overlap(tokens, cand_tokens)
+            jaccard = overlap / (len(tokens) + len(cand_tokens) - overlap)
+            # Contenção: "Newcastle" está todo dentro de "Newcastle United".
+            containment = overlap / min(len(tokens), len(cand_tokens))
+            scored.append((0.5 * dice + 0.25 * jaccard + 0.25 * containment, team_id, cand_name))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:k]
+
+    def best_match(self, name):
+        """
+        Retorna (team_id, score, nome) se houver um candidato confiável e sem ambiguidade; senão None.
+        Num empate entre nomes com as mesmas palavras relevantes, vence o que não tem palavras a mais:
+
+        >>> index = FuzzyTeamIndex()
+        >>> index.add_many({'liverpool': 40, 'afc liverpool': 8669, 'atletico mg': 1062, 'atletico pe': 7853})
+        >>> index.best_match('Liverpoool')[:1]
+        (40,)
+        >>> index.best_match('Atletico') is None
+        True
+        """
+        candidates = self.search(name, k=5)
+        if not candidates or candidates[0][0] < self.threshold:
+            return None
+        score = candidates[0][0]
+        contenders = [c for c in candidates if score - c[0] < self.min_margin]
+        if len({c[1] for c in contenders}) > 1:
+            contenders = self._shortest_exact(contenders)
+            if contenders is None:
+                return None
+        score, team_id, cand_name = contenders[0]
+        return team_id, score, cand_name
+
+    @staticmethod
+    def _shortest_exact(contenders):
+        """Desempate: mesmas palavras relevantes e um nome mais curto que todos os outros ('liverpool' x 'afc liverpool')."""
+        token_sets = {frozenset(_tokens(c[2])) for c in contenders}
+        if len(token_sets) > 1:
+            return None
+        by_length = sorted(contenders, key=lambda c: len(c[2].split()))
+        shortest = len(by_length[0][2].split())
+        winners = {c[1] for c in by_length if len(c[2].split()) == shortest}
+        return by_length if len(winners) == 1 else None
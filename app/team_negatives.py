@@ -0,0 +1,30 @@
+# Arquivo: app/team_negatives.py
+# Descrição: Utilitário para listar e limpar o cache negativo de nomes de times não encontrados.
+# Uso:
+#   python -m app.team_negatives                 -> lista os negativos
+#   python -m app.team_negatives purge           -> remove todos
+#   python -m app.team_negatives purge "nome" .. -> remove apenas os nomes informados
+
+import os
+import sys
+from datetime import datetime
+from app.config import config
+from app.services.team_mapping_store import TeamMappingStore
+
+def main(args):
+    store = TeamMappingStore(config.TEAM_MAPPINGS_DB_PATH, os.path.join(config.MAPPINGS_DIR, 'team_mappings.json'))
+
+    if args and args[0] == 'purge':
+        names = [name.lower().strip() for name in args[1:]]
+        deleted = store.purge_negatives(names or None)
+        print(f"✅ {deleted} nomes removidos do cache negativo.")
+        return
+
+    negatives = store.list_negatives()
+    print(f"--- CACHE NEGATIVO ({len(negatives)} nomes) ---")
+    for name, updated_at, attempts in negatives:
+        last_try = datetime.fromtimestamp(updated_at).strftime('%d/%m/%Y %H:%M')
+        print(f"{name:<50} | tentativas: {attempts:<3} | última: {last_try}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -18,8 +18,11 @@ def load_monitored_config():
         return json.load(f).get('telegram_channel_ids', [])
 
 def save_monitored_config(channel_ids):
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+    # Grava em arquivo temporário e troca atomicamente, para o robô nunca ler um JSON pela metade.
+    tmp_path = CONFIG_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump({'telegram_channel_ids': channel_ids}, f, indent=4)
+    os.replace(tmp_path, CONFIG_PATH)
 
 @st.cache_data(ttl=3600) # Cache por 1 hora
 def load_available_channels():
@@ -58,5 +61,5 @@ else:
     if st.button("Salvar Alterações", type="primary", use_container_width=True):
         new_monitored_ids = [all_channels_map[name] for name in selected_channels]
         save_monitored_config(new_monitored_ids)
-        st.success("✅ Configuração salva! O robô principal irá atualizar o monitoramento em breve.")
+        st.success("✅ Configuração salva! O robô principal atualiza o monitoramento em até 1 segundo.")
         st.rerun()
\ No newline at end of file